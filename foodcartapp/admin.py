@@ -4,12 +4,15 @@ from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
+from .models import Banner
 from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
 from .models import OrderDetails
 from .models import OrderItem
+from .images import get_image_urls
+from .paginators import EstimatedCountPaginator
 from place.models import Place
 from django.conf import settings
 
@@ -17,6 +20,10 @@ from django.conf import settings
 class RestaurantMenuItemInline(admin.TabularInline):
     model = RestaurantMenuItem
     extra = 0
+    autocomplete_fields = [
+        'restaurant',
+        'product',
+    ]
 
 
 @admin.register(Restaurant)
@@ -30,6 +37,10 @@ class RestaurantAdmin(admin.ModelAdmin):
         'name',
         'address',
         'contact_phone',
+        'capacity',
+    ]
+    ordering = [
+        'name',
     ]
     inlines = [
         RestaurantMenuItemInline
@@ -47,9 +58,17 @@ class ProductAdmin(admin.ModelAdmin):
     list_display_links = [
         'name',
     ]
+    list_select_related = [
+        'category',
+    ]
+    ordering = [
+        'name',
+    ]
     list_filter = [
         'category',
     ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = [
         # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
         # Migration to PostgreSQL is necessary
@@ -95,6 +114,13 @@ class ProductAdmin(admin.ModelAdmin):
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
+        images = get_image_urls(obj)
+        if images:
+            return format_html(
+                '<img src="{url}" srcset="{srcset}" sizes="200px" style="max-height: 200px;"/>',
+                url=images['card']['url'],
+                srcset=images['srcset'],
+            )
         return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
     get_image_preview.short_description = 'превью'
 
@@ -102,6 +128,15 @@ class ProductAdmin(admin.ModelAdmin):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
+        images = get_image_urls(obj)
+        if images:
+            return format_html(
+                '<a href="{edit_url}"><picture><source type="image/webp" srcset="{webp}">'
+                '<img src="{src}" style="max-height: 50px;"/></picture></a>',
+                edit_url=edit_url,
+                webp=images['thumb']['webp'],
+                src=images['thumb']['url'],
+            )
         return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
     get_image_list_preview.short_description = 'превью'
 
@@ -114,14 +149,32 @@ class ProductAdmin(admin.ModelAdmin):
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    autocomplete_fields = [
+        'product',
+    ]
 
 
 @admin.register(OrderDetails)
 class OrderDetailsAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'phonenumber', 'address', 'status')
+    list_display = ('full_name', 'phonenumber', 'address', 'status', 'restaurant', 'created_at')
+    list_select_related = [
+        'restaurant',
+    ]
     list_filter = [
         'status',
     ]
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = [
+        'restaurant',
+    ]
+    raw_id_fields = [
+        'place',
+    ]
+    readonly_fields = [
+        'total_cost',
+    ]
 
     def response_change(self, request, obj):
         res = super(OrderDetailsAdmin, self).response_change(request, obj)
@@ -141,7 +194,27 @@ class OrderDetailsAdmin(admin.ModelAdmin):
     ]
 
 
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'title',
+        'position',
+        'is_active',
+        'show_from',
+        'show_until',
+    ]
+    list_editable = [
+        'position',
+        'is_active',
+    ]
+    list_filter = [
+        'is_active',
+    ]
+
+
 @admin.register(Place)
 class PlaceAdmin(admin.ModelAdmin):
-    pass
+    search_fields = [
+        'address',
+    ]
 
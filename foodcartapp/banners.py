@@ -0,0 +1,38 @@
+from django.utils import timezone
+
+from .cache_versions import bump_version, get_version
+from .models import Banner
+
+
+BANNERS_VERSION_KEY = 'foodcartapp:banners:version'
+
+loaded_banners = {}
+
+
+def load_banners():
+    version = get_version(BANNERS_VERSION_KEY)
+    banners = loaded_banners.get(version)
+    if banners is None:
+        banners = list(Banner.objects.filter(is_active=True))
+        loaded_banners.clear()
+        loaded_banners[version] = banners
+    return banners
+
+
+def get_active_banners(now=None):
+    now = now or timezone.now()
+    return [
+        {
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+        }
+        for banner in load_banners()
+        if banner.image
+        and (banner.show_from is None or banner.show_from <= now)
+        and (banner.show_until is None or now < banner.show_until)
+    ]
+
+
+def invalidate_banners():
+    bump_version(BANNERS_VERSION_KEY)
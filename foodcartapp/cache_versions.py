@@ -0,0 +1,12 @@
+from django.core.cache import cache
+
+
+def get_version(key):
+    return cache.get_or_set(key, 1, timeout=None)
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
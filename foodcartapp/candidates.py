@@ -0,0 +1,119 @@
+import sys
+import threading
+from collections import defaultdict
+
+import rollbar
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .distances import get_restaurant_distances
+from .matching import RestaurantMatcher
+from .models import OrderCandidateRestaurant, OrderDetails, Restaurant
+
+
+def get_open_orders():
+    return OrderDetails.objects.filter(status=OrderDetails.Status.UNPROCESSED)
+
+
+def build_candidates(matches):
+    return [
+        OrderCandidateRestaurant(order_id=order_id, restaurant=match.restaurant, distance=match.distance)
+        for order_id, order_matches in matches.items()
+        for match in order_matches
+    ]
+
+
+@transaction.atomic
+def update_order_candidates(orders):
+    """Пересчитывает рестораны, способные приготовить заказы, и расстояния до них.
+
+    Кандидаты и updated_at переписываются только у заказов, чьи кандидаты
+    изменились, чтобы доски менеджеров не получали неизменённые строки.
+    Возвращает число пересчитанных заказов.
+    """
+    orders = list(orders.select_related('place').prefetch_related('order_items'))
+    if not orders:
+        return 0
+
+    order_products = {
+        order.id: [item.product_id for item in order.order_items.all()]
+        for order in orders
+    }
+    matcher = RestaurantMatcher.from_db(
+        product_ids={product_id for product_ids in order_products.values() for product_id in product_ids},
+    )
+    matches = matcher.match(
+        ((order.id, order_products[order.id], order.place) for order in orders),
+        get_restaurant_distances,
+    )
+
+    saved_candidates = defaultdict(set)
+    stored = (
+        OrderCandidateRestaurant.objects
+            .filter(order__in=matches.keys())
+            .values_list('order_id', 'restaurant_id', 'distance')
+    )
+    for order_id, restaurant_id, distance in stored:
+        saved_candidates[order_id].add((restaurant_id, distance))
+    changed_matches = {
+        order_id: order_matches
+        for order_id, order_matches in matches.items()
+        if {(match.restaurant.id, match.distance) for match in order_matches} != saved_candidates[order_id]
+    }
+
+    if changed_matches:
+        OrderCandidateRestaurant.objects.filter(order__in=changed_matches.keys()).delete()
+        OrderCandidateRestaurant.objects.bulk_create(build_candidates(changed_matches))
+        OrderDetails.objects.filter(pk__in=changed_matches.keys()).update(updated_at=timezone.now())
+    return len(orders)
+
+
+def add_new_order_candidates(order, product_ids):
+    """Кандидаты только что созданного заказа, без повторного чтения заказа и его позиций."""
+    matcher = RestaurantMatcher.from_db(product_ids=product_ids)
+    matches = matcher.match([(order.id, product_ids, order.place)], get_restaurant_distances)
+    OrderCandidateRestaurant.objects.bulk_create(build_candidates(matches))
+
+
+scheduled_updates = threading.local()
+
+
+def run_scheduled_candidates_update():
+    product_ids = getattr(scheduled_updates, 'product_ids', set())
+    order_ids = getattr(scheduled_updates, 'order_ids', set())
+    if not product_ids and not order_ids:
+        return
+    scheduled_updates.product_ids, scheduled_updates.order_ids = set(), set()
+
+    orders = get_open_orders().filter(
+        Q(order_items__product__in=product_ids) | Q(pk__in=order_ids)
+    ).distinct()
+    try:
+        update_order_candidates(orders)
+    except Exception:
+        # транзакция уже закоммичена, запрос не должен падать из-за пересчёта
+        rollbar.report_exc_info(sys.exc_info())
+
+
+def schedule_candidates_update(product_ids=(), order_ids=()):
+    """Пересчитывает кандидатов для заказов с этими товарами и для этих заказов после коммита.
+
+    Идентификаторы копятся в потоке, и первый колбэк после коммита пересчитывает
+    их все одним запросом, остальные ничего не делают: сохранение ресторана
+    с десятками пунктов меню не запускает десятки пересчётов. Идентификаторы
+    из откатившейся транзакции пересчитаются вместе со следующей — лишний
+    пересчёт ничего не портит.
+    """
+    if not hasattr(scheduled_updates, 'product_ids'):
+        scheduled_updates.product_ids, scheduled_updates.order_ids = set(), set()
+    scheduled_updates.product_ids.update(product_ids)
+    scheduled_updates.order_ids.update(order_ids)
+    transaction.on_commit(run_scheduled_candidates_update)
+
+
+def update_candidates_for_place(place_id):
+    orders = get_open_orders()
+    if not Restaurant.objects.filter(place=place_id).exists():
+        orders = orders.filter(place=place_id)
+    return update_order_candidates(orders)
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.core.cache import cache
+
+from .cache_versions import bump_version, get_version
+from .images import get_image_urls
+from .models import Product
+from .responses import compress, dumps
+
+
+CATALOGUE_VERSION_KEY = 'foodcartapp:catalogue:version'
+CATALOGUE_COMPRESSED_TIMEOUT = 24 * 60 * 60
+
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        },
+        'image': product.image.url,
+        'images': get_image_urls(product),
+        'restaurant': {
+            'id': product.id,
+            'name': product.name,
+        }
+    }
+
+
+def build_catalogue():
+    products = Product.objects.select_related('category').available()
+    content = dumps([serialize_product(product) for product in products])
+    etag = f'"{hashlib.sha1(content).hexdigest()}"'
+    return content, etag
+
+
+def get_catalogue():
+    """Возвращает (content, etag) каталога, собирая его только после изменений."""
+    version = get_version(CATALOGUE_VERSION_KEY)
+    key = f'foodcartapp:catalogue:{version}'
+    catalogue = cache.get(key)
+    if catalogue is None:
+        catalogue = build_catalogue()
+        cache.set(key, catalogue, timeout=None)
+    return catalogue
+
+
+def get_compressed_catalogue(content, etag, encoding):
+    """Сжатый каталог; ключ — ETag, то есть хеш содержимого, поэтому версии не перепутаются."""
+    key = f'foodcartapp:catalogue:{etag}:{encoding}'
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(content, encoding)
+        cache.set(key, compressed, timeout=CATALOGUE_COMPRESSED_TIMEOUT)
+    return compressed
+
+
+def invalidate_catalogue():
+    bump_version(CATALOGUE_VERSION_KEY)
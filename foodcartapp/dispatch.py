@@ -0,0 +1,83 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .candidates import get_open_orders
+from .models import OrderCandidateRestaurant, OrderDetails, Restaurant
+
+
+def assign_greedy(order_ids, restaurant_ids, distances, capacities):
+    """Назначает рестораны, начиная с самых коротких расстояний во всём наборе.
+
+    order_ids, restaurant_ids, distances — параллельные массивы пар заказ—ресторан,
+    capacities — {restaurant_id: сколько заказов ещё можно отдать}.
+    Каждый заказ получает не больше одного ресторана. Возвращает {order_id: restaurant_id}.
+    """
+    remaining = {restaurant_id: capacity for restaurant_id, capacity in capacities.items() if capacity > 0}
+    free_slots = sum(remaining.values())
+    orders_count = len(set(order_ids.tolist()))
+    by_distance = np.argsort(distances, kind='stable')
+
+    assignments = {}
+    for order_id, restaurant_id in zip(order_ids[by_distance].tolist(), restaurant_ids[by_distance].tolist()):
+        if len(assignments) == orders_count or not free_slots:
+            break
+        if order_id in assignments or not remaining.get(restaurant_id):
+            continue
+        assignments[order_id] = restaurant_id
+        remaining[restaurant_id] -= 1
+        free_slots -= 1
+    return assignments
+
+
+def get_remaining_capacities():
+    busy = Counter(
+        get_open_orders()
+            .filter(restaurant__isnull=False)
+            .values_list('restaurant_id', flat=True)
+    )
+    return {
+        restaurant_id: capacity - busy[restaurant_id]
+        for restaurant_id, capacity in Restaurant.objects.values_list('id', 'capacity')
+    }
+
+
+@transaction.atomic
+def dispatch_orders():
+    """Назначает рестораны необработанным заказам без ресторана.
+
+    Кандидаты и расстояния берутся из OrderCandidateRestaurant; заказы без
+    известного расстояния остаются менеджеру. Возвращает число назначенных заказов.
+    """
+    open_order_ids = list(
+        get_open_orders()
+            .filter(restaurant__isnull=True)
+            .select_for_update()
+            .values_list('id', flat=True)
+    )
+    candidates = list(
+        OrderCandidateRestaurant.objects
+            .filter(order__in=open_order_ids, distance__isnull=False)
+            .values_list('order_id', 'restaurant_id', 'distance')
+    )
+    if not candidates:
+        return 0
+
+    order_ids, restaurant_ids, distances = (np.array(column) for column in zip(*candidates))
+    assignments = assign_greedy(order_ids, restaurant_ids, distances, get_remaining_capacities())
+
+    orders_by_restaurant = defaultdict(list)
+    for order_id, restaurant_id in assignments.items():
+        orders_by_restaurant[restaurant_id].append(order_id)
+
+    now = timezone.now()
+    assigned = 0
+    for restaurant_id, restaurant_order_ids in orders_by_restaurant.items():
+        assigned += (
+            OrderDetails.objects
+                .filter(pk__in=restaurant_order_ids, restaurant__isnull=True)
+                .update(restaurant=restaurant_id, updated_at=now)
+        )
+    return assigned
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from place.models import PlaceDistance
+from place.utils import parse_coordinates
+
+from .matching import haversine_pairs_km
+
+
+DISTANCE_CACHE_STATS_KEYS = {
+    'memory_hits': 'distance_cache:memory_hits',
+    'db_hits': 'distance_cache:db_hits',
+    'misses': 'distance_cache:misses',
+}
+
+
+def increment_counter(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, delta)
+
+
+def get_distance_cache_stats():
+    counters = cache.get_many(DISTANCE_CACHE_STATS_KEYS.values())
+    stats = {name: counters.get(key, 0) for name, key in DISTANCE_CACHE_STATS_KEYS.items()}
+    stats['memory_size'] = len(distance_cache)
+    stats['memory_maxsize'] = distance_cache.maxsize
+    return stats
+
+
+class PlaceDistanceCache:
+    """Расстояния между местом ресторана и местом доставки.
+
+    Сначала ищет в LRU-кэше процесса, затем в таблице PlaceDistance, недостающие
+    расстояния считает одним вызовом haversine и сохраняет в таблицу.
+    В кэше процесса вместе с расстоянием хранятся координаты мест: если место
+    перегеокодировали в другом процессе, запись не совпадёт и будет пересчитана.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_many(self, place_pairs):
+        """Принимает пары (restaurant_place, order_place), возвращает {(id, id): км}.
+
+        Пары, где у одного из мест нет координат, в ответ не попадают.
+        """
+        located_pairs = {}
+        for restaurant_place, order_place in place_pairs:
+            restaurant_coordinates = parse_coordinates(restaurant_place.lat, restaurant_place.lon)
+            order_coordinates = parse_coordinates(order_place.lat, order_place.lon)
+            if restaurant_coordinates and order_coordinates:
+                located_pairs[(restaurant_place.id, order_place.id)] = (restaurant_coordinates, order_coordinates)
+
+        distances = {}
+        with self.lock:
+            for pair, coordinates in located_pairs.items():
+                entry = self.entries.get(pair)
+                if entry and entry[0] == coordinates:
+                    self.entries.move_to_end(pair)
+                    distances[pair] = entry[1]
+        memory_hits = len(distances)
+
+        missing = [pair for pair in located_pairs if pair not in distances]
+        db_hits = 0
+        if missing:
+            stored = (
+                PlaceDistance.objects
+                    .filter(
+                        restaurant_place__in={restaurant_place_id for restaurant_place_id, _ in missing},
+                        order_place__in={order_place_id for _, order_place_id in missing},
+                    )
+                    .values_list('restaurant_place_id', 'order_place_id', 'distance')
+            )
+            missing_set = set(missing)
+            for restaurant_place_id, order_place_id, distance in stored:
+                pair = (restaurant_place_id, order_place_id)
+                if pair in missing_set and pair not in distances:
+                    distances[pair] = distance
+                    db_hits += 1
+            missing = [pair for pair in missing if pair not in distances]
+
+        if missing:
+            computed = haversine_pairs_km(
+                [located_pairs[pair][0] for pair in missing],
+                [located_pairs[pair][1] for pair in missing],
+            )
+            new_distances = []
+            for pair, distance in zip(missing, computed.tolist()):
+                distances[pair] = distance
+                new_distances.append(PlaceDistance(
+                    restaurant_place_id=pair[0],
+                    order_place_id=pair[1],
+                    distance=distance,
+                ))
+            PlaceDistance.objects.bulk_create(new_distances, ignore_conflicts=True)
+
+        with self.lock:
+            for pair, distance in distances.items():
+                self.entries[pair] = (located_pairs[pair], distance)
+                self.entries.move_to_end(pair)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        increment_counter(DISTANCE_CACHE_STATS_KEYS['memory_hits'], memory_hits)
+        increment_counter(DISTANCE_CACHE_STATS_KEYS['db_hits'], db_hits)
+        increment_counter(DISTANCE_CACHE_STATS_KEYS['misses'], len(missing))
+        return distances
+
+    def invalidate_place(self, place_id):
+        PlaceDistance.objects.filter(Q(restaurant_place=place_id) | Q(order_place=place_id)).delete()
+        with self.lock:
+            for pair in [pair for pair in self.entries if place_id in pair]:
+                del self.entries[pair]
+
+
+distance_cache = PlaceDistanceCache(settings.DISTANCE_CACHE_SIZE)
+
+
+def get_restaurant_distances(pairs):
+    """Для пар (restaurant, order_place) возвращает {(restaurant, order_place): км}."""
+    place_pairs = [
+        (restaurant.place, order_place)
+        for restaurant, order_place in pairs
+        if restaurant.place and order_place
+    ]
+    distances = distance_cache.get_many(place_pairs)
+    return {
+        (restaurant, order_place): distances.get((restaurant.place_id, order_place.id))
+        for restaurant, order_place in pairs
+        if restaurant.place and order_place
+    }
@@ -0,0 +1,104 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+IMAGE_DERIVATIVES = {
+    'thumb': (100, 100),
+    'card': (300, 300),
+    'card_2x': (600, 600),
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+
+def encode_image(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    elif image_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def save_derivative(source_name, label, content, extension):
+    """Сохраняет картинку рядом с оригиналом под именем с хешем содержимого."""
+    stem, _ = os.path.splitext(source_name)
+    digest = hashlib.sha1(content).hexdigest()[:12]
+    name = f'{stem}.{label}.{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def make_image_derivatives(image_field):
+    """Создаёт уменьшенные копии картинки в исходном формате и WebP.
+
+    Возвращает описание для Product.image_derivatives:
+    {'source': имя оригинала, 'thumb': {'width', 'height', 'image', 'webp'}, ...}.
+    """
+    with image_field.open('rb'):
+        source = Image.open(image_field)
+        source = ImageOps.exif_transpose(source)
+        source.load()
+
+    has_alpha = source.mode in ('RGBA', 'LA') or (source.mode == 'P' and 'transparency' in source.info)
+    source = source.convert('RGBA' if has_alpha else 'RGB')
+    image_format, extension = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+
+    derivatives = {'source': image_field.name}
+    for label, size in IMAGE_DERIVATIVES.items():
+        image = source.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        derivatives[label] = {
+            'width': image.width,
+            'height': image.height,
+            'image': save_derivative(image_field.name, label, encode_image(image, image_format), extension),
+            'webp': save_derivative(image_field.name, label, encode_image(image, 'WEBP'), 'webp'),
+        }
+    return derivatives
+
+
+def get_derivative_names(derivatives):
+    return {
+        name
+        for label in IMAGE_DERIVATIVES
+        for name in (derivatives.get(label) or {}).values()
+        if isinstance(name, str)
+    }
+
+
+def delete_image_derivatives(derivatives, keep=None):
+    for name in get_derivative_names(derivatives) - get_derivative_names(keep or {}):
+        default_storage.delete(name)
+
+
+def has_fresh_derivatives(product):
+    return bool(product.image) and product.image_derivatives.get('source') == product.image.name
+
+
+def get_image_urls(product):
+    """Ссылки на уменьшенные копии и готовые srcset для <img> и <source type="image/webp">."""
+    if not has_fresh_derivatives(product):
+        return None
+    sizes = {
+        label: {
+            'width': product.image_derivatives[label]['width'],
+            'height': product.image_derivatives[label]['height'],
+            'url': default_storage.url(product.image_derivatives[label]['image']),
+            'webp': default_storage.url(product.image_derivatives[label]['webp']),
+        }
+        for label in IMAGE_DERIVATIVES
+        if label in product.image_derivatives
+    }
+    return {
+        **sizes,
+        'srcset': ', '.join(f"{size['url']} {size['width']}w" for size in sizes.values()),
+        'webp_srcset': ', '.join(f"{size['webp']} {size['width']}w" for size in sizes.values()),
+    }
@@ -0,0 +1,53 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from foodcartapp.models import Product
+from foodcartapp.views import register_order
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Считает SQL-запросы на оформление заказа при разном размере корзины. Данные не сохраняются.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 20, 100])
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.values_list('id', flat=True))
+        if not product_ids:
+            raise CommandError('Нет ни одного товара, добавьте товары в админке.')
+
+        factory = APIRequestFactory()
+        self.stdout.write('Позиций\tЗапросов\tВремя, мс')
+        for size in options['sizes']:
+            payload = {
+                'firstname': 'Бенчмарк',
+                'lastname': 'Бенчмарк',
+                'phonenumber': '+79000000000',
+                'address': 'Москва',
+                'products': [
+                    {'product': product_id, 'quantity': 1}
+                    for product_id in itertools.islice(itertools.cycle(product_ids), size)
+                ],
+            }
+            request = factory.post('/api/order/', payload, format='json')
+            try:
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        started_at = time.perf_counter()
+                        response = register_order(request)
+                        elapsed = time.perf_counter() - started_at
+                    raise Rollback
+            except Rollback:
+                pass
+            if response is None or response.status_code != 200:
+                raise CommandError(f'Заказ из {size} позиций не оформлен')
+            self.stdout.write(f'{size}\t{len(queries)}\t{elapsed * 1000:.1f}')
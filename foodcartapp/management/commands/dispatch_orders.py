@@ -0,0 +1,16 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.dispatch import dispatch_orders
+
+
+class Command(BaseCommand):
+    help = 'Назначает рестораны необработанным заказам с учётом расстояния и вместимости ресторанов.'
+
+    def handle(self, *args, **options):
+        started_at = monotonic()
+        assigned = dispatch_orders()
+        self.stdout.write(self.style.SUCCESS(
+            f'Назначены рестораны для {assigned} заказов за {monotonic() - started_at:.2f} с'
+        ))
@@ -0,0 +1,158 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import monotonic, sleep
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.candidates import get_open_orders, update_order_candidates
+from foodcartapp.models import OrderDetails, Restaurant
+from foodcartapp.spatial import invalidate_restaurant_index
+from place.geocoding import get_geocoder
+from place.models import Place
+from place.utils import normalize_address, parse_coordinates
+
+
+class RateLimiter:
+    """Пропускает не больше rate вызовов в секунду на все потоки."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_call = monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            sleep(delay)
+
+
+def fetch_with_retries(geocoder, address, rate_limiter, retries, backoff):
+    for attempt in range(retries + 1):
+        rate_limiter.wait()
+        try:
+            return geocoder.fetch_coordinates(address)
+        except Exception:
+            if attempt == retries:
+                raise
+            sleep(backoff * 2 ** attempt)
+
+
+def collect_unlinked_addresses():
+    """Адреса ресторанов и заказов без места: {нормализованный адрес: {исходные адреса}}."""
+    addresses = {}
+    for model in [Restaurant, OrderDetails]:
+        unlinked = (
+            model.objects
+                .filter(place__isnull=True)
+                .values_list('address', flat=True)
+                .distinct()
+        )
+        for address in unlinked:
+            addresses.setdefault(normalize_address(address), set()).add(address)
+    return addresses
+
+
+def get_place_ids(addresses):
+    """{нормализованный адрес: id места}, включая места, сохранённые с исходным адресом."""
+    raw_addresses = set().union(*addresses.values()) if addresses else set()
+    places = (
+        Place.objects
+            .filter(address__in=raw_addresses | set(addresses))
+            .values_list('address', 'id')
+    )
+    place_ids = {}
+    for address, place_id in places:
+        normalized_address = normalize_address(address)
+        if address == normalized_address or normalized_address not in place_ids:
+            place_ids[normalized_address] = place_id
+    return place_ids
+
+
+class Command(BaseCommand):
+    help = 'Геокодирует адреса ресторанов и заказов, у которых ещё нет места, и привязывает к ним места.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='число параллельных запросов к геокодеру')
+        parser.add_argument('--rate', type=float, default=10, help='не больше запросов в секунду, 0 — без ограничения')
+        parser.add_argument('--retries', type=int, default=3, help='повторов при ошибке геокодера')
+        parser.add_argument('--backoff', type=float, default=0.5, help='пауза перед первым повтором, секунд')
+        parser.add_argument('--batch-size', type=int, default=500, help='сколько мест сохранять одним запросом')
+
+    def handle(self, *args, **options):
+        addresses = collect_unlinked_addresses()
+        known_place_ids = get_place_ids(addresses)
+        missing_addresses = [address for address in addresses if address not in known_place_ids]
+        self.stdout.write(
+            f'Адресов без места: {len(addresses)}, из них нужно геокодировать: {len(missing_addresses)}'
+        )
+
+        geocoder = get_geocoder()
+        rate_limiter = RateLimiter(options['rate'])
+        places = []
+        failed = 0
+        started_at = monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='geocode_places') as executor:
+            futures = {
+                executor.submit(
+                    fetch_with_retries,
+                    geocoder,
+                    address,
+                    rate_limiter,
+                    options['retries'],
+                    options['backoff'],
+                ): address
+                for address in missing_addresses
+            }
+            for future in as_completed(futures):
+                address = futures[future]
+                try:
+                    found_coordinates = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{address}: {error!r}')
+                    continue
+                lat, lon = (found_coordinates and parse_coordinates(*found_coordinates)) or (None, None)
+                places.append(Place(address=address, lat=lat, lon=lon, update_date=timezone.now()))
+        elapsed = monotonic() - started_at
+
+        Place.objects.bulk_create(places, batch_size=options['batch_size'], ignore_conflicts=True)
+        linked_orders, linked_restaurants = self.link_places(addresses)
+
+        if linked_restaurants:
+            invalidate_restaurant_index()
+            update_order_candidates(get_open_orders())
+        elif linked_orders:
+            update_order_candidates(get_open_orders().filter(place__isnull=False))
+
+        throughput = len(missing_addresses) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Геокодировано {len(places)} адресов за {elapsed:.1f} с ({throughput:.1f} адресов/с), '
+            f'ошибок: {failed}. Привязано ресторанов: {linked_restaurants}, заказов: {linked_orders}'
+        ))
+
+    @transaction.atomic
+    def link_places(self, addresses):
+        place_ids = get_place_ids(addresses)
+        linked_orders = linked_restaurants = 0
+        for normalized_address, raw_addresses in addresses.items():
+            place_id = place_ids.get(normalized_address)
+            if not place_id:
+                continue
+            linked_restaurants += (
+                Restaurant.objects
+                    .filter(address__in=raw_addresses, place__isnull=True)
+                    .update(place=place_id)
+            )
+            linked_orders += (
+                OrderDetails.objects
+                    .filter(address__in=raw_addresses, place__isnull=True)
+                    .update(place=place_id, updated_at=timezone.now())
+            )
+        return linked_orders, linked_restaurants
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodcartapp.catalogue import invalidate_catalogue
+from foodcartapp.images import delete_image_derivatives, has_fresh_derivatives, make_image_derivatives
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии и WebP для картинок товаров, у которых их ещё нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='пересоздать копии для всех товаров',
+        )
+
+    def handle(self, *args, **options):
+        created = failed = 0
+        for product in Product.objects.exclude(image='').only('id', 'image', 'image_derivatives'):
+            if has_fresh_derivatives(product) and not options['force']:
+                continue
+            try:
+                derivatives = make_image_derivatives(product.image)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{product.image.name}: {error}')
+                continue
+            Product.objects.filter(pk=product.pk).update(image_derivatives=derivatives)
+            delete_image_derivatives(product.image_derivatives, keep=derivatives)
+            created += 1
+
+        if created:
+            transaction.on_commit(invalidate_catalogue)
+        self.stdout.write(self.style.SUCCESS(f'Созданы копии картинок для {created} товаров, ошибок: {failed}'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from foodcartapp.models import OrderDetails
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённую стоимость заказов по их позициям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='только сверить стоимость с суммой позиций, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        mismatched_orders = (
+            OrderDetails.objects
+                .get_order_with_cost()
+                .exclude(total_cost=Coalesce(F('cost'), 0))
+        )
+        if options['check']:
+            mismatched_ids = list(mismatched_orders.values_list('id', flat=True))
+            if mismatched_ids:
+                raise CommandError(f'Стоимость расходится у {len(mismatched_ids)} заказов: {mismatched_ids[:20]}')
+            self.stdout.write(self.style.SUCCESS('Стоимость всех заказов совпадает с суммой позиций'))
+            return
+
+        with transaction.atomic():
+            updated = OrderDetails.objects.update_total_cost()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитана стоимость {updated} заказов'))
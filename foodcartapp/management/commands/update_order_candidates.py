@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.candidates import get_open_orders, update_order_candidates
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает подходящие рестораны для необработанных заказов.'
+
+    def handle(self, *args, **options):
+        updated = update_order_candidates(get_open_orders())
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны рестораны для {updated} заказов'))
@@ -0,0 +1,102 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .models import Restaurant, RestaurantMenuItem
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+RestaurantMatch = namedtuple('RestaurantMatch', ['restaurant', 'distance'])
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def haversine_pairs_km(points, origins):
+    """Расстояния (км) между парами points[i] и origins[i]."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+    return haversine(points[:, 0], points[:, 1], origins[:, 0], origins[:, 1])
+
+
+class RestaurantMatcher:
+    def __init__(self, restaurants, available_items):
+        self.restaurants = list(restaurants)
+        positions = {restaurant.id: position for position, restaurant in enumerate(self.restaurants)}
+
+        self.product_masks = {}
+        for restaurant_id, product_id in available_items:
+            position = positions.get(restaurant_id)
+            if position is None:
+                continue
+            self.product_masks[product_id] = self.product_masks.get(product_id, 0) | (1 << position)
+
+    @classmethod
+    def from_db(cls, product_ids=None):
+        """Загружает рестораны и меню; если заданы product_ids, то только пункты с этими товарами."""
+        restaurants = Restaurant.objects.select_related('place').order_by('id')
+        available_items = RestaurantMenuItem.objects.filter(availability=True)
+        if product_ids is not None:
+            available_items = available_items.filter(product__in=set(product_ids))
+        return cls(restaurants, available_items.values_list('restaurant_id', 'product_id'))
+
+    def capable_mask(self, product_ids):
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+        mask = (1 << len(self.restaurants)) - 1
+        for product_id in product_ids:
+            mask &= self.product_masks.get(product_id, 0)
+            if not mask:
+                break
+        return mask
+
+    def capable_positions(self, product_ids):
+        mask = self.capable_mask(product_ids)
+        positions = []
+        while mask:
+            lowest = mask & -mask
+            positions.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return positions
+
+    def match(self, orders, get_distances):
+        """Подбирает рестораны для заказов.
+
+        orders — итерируемое из (order_id, product_ids, order_place),
+        get_distances — функция, принимающая список пар (restaurant, order_place)
+        и возвращающая {(restaurant, order_place): км или None}.
+        Возвращает {order_id: [RestaurantMatch, ...]}, отсортированные по расстоянию,
+        рестораны без известного расстояния идут последними с distance=None.
+        """
+        orders = [
+            (order_id, self.capable_positions(product_ids), order_place)
+            for order_id, product_ids, order_place in orders
+        ]
+        pairs = [
+            (self.restaurants[position], order_place)
+            for _, positions, order_place in orders
+            for position in positions
+        ]
+        distances = get_distances(pairs) if pairs else {}
+
+        matches = {}
+        for order_id, positions, order_place in orders:
+            order_matches = [
+                RestaurantMatch(
+                    self.restaurants[position],
+                    distances.get((self.restaurants[position], order_place)),
+                )
+                for position in positions
+            ]
+            order_matches.sort(key=lambda match: (match.distance is None, match.distance or 0))
+            matches[order_id] = order_matches
+        return matches
+
@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 20:34
+
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+
+DEFAULT_BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def fill_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    for position, (title, filename, text) in enumerate(DEFAULT_BANNERS):
+        image_path = os.path.join(settings.BASE_DIR, 'assets', filename)
+        if not os.path.exists(image_path):
+            continue
+        banner = Banner(title=title, text=text, position=position)
+        if default_storage.exists(filename):
+            banner.image.name = filename
+        else:
+            with open(image_path, 'rb') as image:
+                banner.image.save(filename, File(image), save=False)
+        banner.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0077_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_banners, migrations.RunPython.noop),
+    ]
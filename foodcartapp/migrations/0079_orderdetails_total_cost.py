@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-18 20:36
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_total_cost(apps, schema_editor):
+    OrderDetails = apps.get_model('foodcartapp', 'OrderDetails')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+    items_cost = (
+        OrderItem.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(cost=Sum('position_cost'))
+            .values('cost')
+    )
+    OrderDetails.objects.update(total_cost=Coalesce(
+        Subquery(items_cost),
+        Value(0),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0078_fill_banners'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdetails',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Стоимость заказа'),
+        ),
+        migrations.RunPython(fill_total_cost, migrations.RunPython.noop),
+    ]
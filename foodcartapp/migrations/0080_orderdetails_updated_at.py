@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 21:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0079_orderdetails_total_cost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdetails',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Время изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 20:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from place.utils import normalize_address
+
+
+def link_places(apps, schema_editor):
+    Place = apps.get_model('place', 'Place')
+    Restaurant = apps.get_model('foodcartapp', 'Restaurant')
+    OrderDetails = apps.get_model('foodcartapp', 'OrderDetails')
+
+    place_ids = {}
+    for place_id, address in Place.objects.values_list('id', 'address'):
+        place_ids.setdefault(normalize_address(address), place_id)
+        place_ids[address] = place_id
+
+    for model in [Restaurant, OrderDetails]:
+        addresses = model.objects.filter(place__isnull=True).values_list('address', flat=True).distinct()
+        for address in addresses:
+            place_id = place_ids.get(address) or place_ids.get(normalize_address(address))
+            if place_id:
+                model.objects.filter(address=address, place__isnull=True).update(place_id=place_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('place', '0002_numeric_coordinates'),
+        ('foodcartapp', '0081_ordercandidaterestaurant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdetails',
+            name='place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='place.place', verbose_name='Место'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='restaurants', to='place.place', verbose_name='место'),
+        ),
+        migrations.RunPython(link_places, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0083_orderidempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='capacity',
+            field=models.PositiveIntegerField(default=10, help_text='сколько необработанных заказов автоматически назначать ресторану одновременно', verbose_name='вместимость'),
+        ),
+    ]
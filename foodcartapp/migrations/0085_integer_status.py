@@ -0,0 +1,82 @@
+# Generated by Django 3.2 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+STATUS_CODES = {
+    'Необработанный': 1,
+    'Обработанный': 2,
+}
+PAYMENT_METHOD_CODES = {
+    'Наличностью': 1,
+    'Электронно': 2,
+}
+
+
+def encode_choices(apps, schema_editor):
+    OrderDetails = apps.get_model('foodcartapp', 'OrderDetails')
+    for status, code in STATUS_CODES.items():
+        OrderDetails.objects.filter(status=status).update(status_code=code)
+    for payment_method, code in PAYMENT_METHOD_CODES.items():
+        OrderDetails.objects.filter(payment_method=payment_method).update(payment_method_code=code)
+
+
+def decode_choices(apps, schema_editor):
+    OrderDetails = apps.get_model('foodcartapp', 'OrderDetails')
+    for status, code in STATUS_CODES.items():
+        OrderDetails.objects.filter(status_code=code).update(status=status)
+    for payment_method, code in PAYMENT_METHOD_CODES.items():
+        OrderDetails.objects.filter(payment_method_code=code).update(payment_method=payment_method)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0084_restaurant_capacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdetails',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='orderdetails',
+            name='payment_method_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(encode_choices, decode_choices),
+        migrations.RemoveField(
+            model_name='orderdetails',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='orderdetails',
+            name='payment_method',
+        ),
+        migrations.RenameField(
+            model_name='orderdetails',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.RenameField(
+            model_name='orderdetails',
+            old_name='payment_method_code',
+            new_name='payment_method',
+        ),
+        migrations.AlterField(
+            model_name='orderdetails',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Необработанный'), (2, 'Обработанный')], default=1, verbose_name='Статус заказа'),
+        ),
+        migrations.AlterField(
+            model_name='orderdetails',
+            name='payment_method',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Наличностью'), (2, 'Электронно')], null=True, verbose_name='Платежный метод'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetails',
+            index=models.Index(condition=models.Q(status=STATUS_CODES['Необработанный']), fields=['created_at', 'id'], name='orderdetails_unprocessed_idx'),
+        ),
+    ]
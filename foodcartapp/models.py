@@ -1,9 +1,12 @@
 from django.utils import timezone
 from django.db import models
 from django.core.validators import MinValueValidator
-from django.db.models import Sum
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from phonenumber_field.modelfields import PhoneNumberField
 
+from place.models import Place
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -20,6 +23,19 @@ class Restaurant(models.Model):
         max_length=50,
         blank=True,
     )
+    capacity = models.PositiveIntegerField(
+        'вместимость',
+        default=10,
+        help_text='сколько необработанных заказов автоматически назначать ресторану одновременно',
+    )
+    place = models.ForeignKey(
+        Place,
+        verbose_name='место',
+        related_name='restaurants',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
 
     class Meta:
         verbose_name = 'ресторан'
@@ -75,6 +91,12 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    image_derivatives = models.JSONField(
+        'уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -131,21 +153,54 @@ class OrderDetailsQuerySet(models.QuerySet):
         order_with_cost = self.annotate(cost=Sum('order_items__position_cost'))
         return order_with_cost
 
+    def update_total_cost(self):
+        items_cost = (
+            OrderItem.objects
+                .filter(order=OuterRef('pk'))
+                .values('order')
+                .annotate(cost=Sum('position_cost'))
+                .values('cost')
+        )
+        return self.update(
+            total_cost=Coalesce(
+                Subquery(items_cost),
+                Value(0),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+class OrderStatus(models.IntegerChoices):
+    UNPROCESSED = 1, 'Необработанный'
+    PROCESSED = 2, 'Обработанный'
+
 
 class OrderDetails(models.Model):
+    # вне класса, чтобы на статус могло ссылаться условие индекса в Meta
+    Status = OrderStatus
+
+    class PaymentMethod(models.IntegerChoices):
+        CASH = 1, 'Наличностью'
+        ELECTRONIC = 2, 'Электронно'
+
     firstname = models.CharField('Имя', max_length=50, db_index=True)
     lastname = models.CharField('Фамилия', max_length=50, db_index=True)
     phonenumber = PhoneNumberField('Телефон', db_index=True)
     address = models.CharField('Адрес', max_length=100, db_index=True)
-    status = models.CharField('Статус заказа', max_length=50,
-                              choices=[('Обработанный', 'Обработанный'),
-                                       ('Необработанный', 'Необработанный')],
-                              default='Необработанный',
-                              db_index=True)
-    payment_method = models.CharField('Платежный метод', max_length=50, blank=True,
-                                      choices=[('Наличностью', 'Наличностью'),
-                                               ('Электронно', 'Электронно')],
-                                      db_index=True)
+    place = models.ForeignKey(Place,
+                              on_delete=models.SET_NULL,
+                              related_name='orders',
+                              verbose_name='Место',
+                              null=True,
+                              blank=True)
+    status = models.PositiveSmallIntegerField('Статус заказа',
+                                              choices=Status.choices,
+                                              default=Status.UNPROCESSED)
+    payment_method = models.PositiveSmallIntegerField('Платежный метод',
+                                                      choices=PaymentMethod.choices,
+                                                      null=True,
+                                                      blank=True)
     restaurant = models.ForeignKey(Restaurant,
                                    on_delete=models.SET_NULL,
                                    related_name='orders',
@@ -153,15 +208,25 @@ class OrderDetails(models.Model):
                                    null=True,
                                    blank=True)
     comments = models.TextField('Комментарии к заказу', blank=True)
+    total_cost = models.DecimalField('Стоимость заказа', max_digits=10, decimal_places=2, default=0,
+                                     validators=[MinValueValidator(0)])
     created_at = models.DateTimeField('Время создания', default=timezone.now, db_index=True)
     called_at = models.DateTimeField('Время звонка', blank=True, null=True, db_index=True)
     delivered_at = models.DateTimeField('Время доставки', blank=True, null=True, db_index=True)
+    updated_at = models.DateTimeField('Время изменения', auto_now=True, db_index=True)
 
     objects = OrderDetailsQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                name='orderdetails_unprocessed_idx',
+                condition=models.Q(status=OrderStatus.UNPROCESSED),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.firstname} {self.lastname}"
@@ -192,3 +257,69 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product.name} {self.order.firstname} {self.order.lastname}"
+
+
+class Banner(models.Model):
+    title = models.CharField('заголовок', max_length=50)
+    image = models.ImageField('картинка')
+    text = models.CharField('текст', max_length=200, blank=True)
+    position = models.PositiveIntegerField('порядок', default=0, db_index=True)
+    is_active = models.BooleanField('показывать', default=True, db_index=True)
+    show_from = models.DateTimeField('показывать с', null=True, blank=True)
+    show_until = models.DateTimeField('показывать до', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
+
+
+class OrderCandidateRestaurant(models.Model):
+    order = models.ForeignKey(
+        OrderDetails,
+        related_name='candidate_restaurants',
+        verbose_name='заказ',
+        on_delete=models.CASCADE,
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        related_name='order_candidates',
+        verbose_name='ресторан',
+        on_delete=models.CASCADE,
+    )
+    distance = models.FloatField('расстояние, км', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'подходящий ресторан'
+        verbose_name_plural = 'подходящие рестораны'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.restaurant_id}"
+
+
+class OrderIdempotencyKey(models.Model):
+    key = models.CharField('ключ', max_length=255, unique=True)
+    request_hash = models.CharField('хеш запроса', max_length=64)
+    order = models.ForeignKey(
+        OrderDetails,
+        related_name='idempotency_keys',
+        verbose_name='заказ',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    response = models.JSONField('ответ', null=True, blank=True)
+    created_at = models.DateTimeField('создан', default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
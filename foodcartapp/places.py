@@ -0,0 +1,36 @@
+from django.utils import timezone
+
+from place.geocoding import enqueue_geocoding
+from place.utils import normalize_address
+
+from .candidates import get_open_orders, update_order_candidates
+from .models import OrderDetails, Restaurant
+from .spatial import invalidate_restaurant_index
+
+
+def is_place_linked(obj):
+    if not obj.place_id:
+        return False
+    return obj.place.address in {obj.address, normalize_address(obj.address)}
+
+
+def link_order_place(order_id, address):
+    def on_resolved(place):
+        linked = (
+            OrderDetails.objects
+                .filter(pk=order_id, address=address)
+                .update(place=place, updated_at=timezone.now())
+        )
+        if linked:
+            update_order_candidates(OrderDetails.objects.filter(pk=order_id))
+
+    enqueue_geocoding(address, on_resolved=on_resolved)
+
+
+def link_restaurant_place(restaurant_id, address):
+    def on_resolved(place):
+        Restaurant.objects.filter(pk=restaurant_id, address=address).update(place=place)
+        invalidate_restaurant_index()
+        update_order_candidates(get_open_orders())
+
+    enqueue_geocoding(address, on_resolved=on_resolved)
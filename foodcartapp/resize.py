@@ -0,0 +1,146 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils._os import safe_join
+from PIL import Image, ImageOps
+
+from .images import IMAGE_DERIVATIVES, encode_image
+
+
+RESIZE_FORMATS = {
+    '.jpg': ('JPEG', 'jpg'),
+    '.jpeg': ('JPEG', 'jpg'),
+    '.png': ('PNG', 'png'),
+    '.webp': ('WEBP', 'webp'),
+}
+RESIZE_SIZES = set(IMAGE_DERIVATIVES.values())
+RESIZE_CACHE_SIZE_KEY = 'foodcartapp:resize_cache:bytes'
+# вытесняем с запасом, чтобы следующая картинка не запускала обход снова
+RESIZE_CACHE_EVICT_TO = 0.9
+
+
+@contextmanager
+def locked(lock_path):
+    """Эксклюзивная блокировка файла, общая для всех процессов на сервере."""
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_source_path(path):
+    """Путь к оригиналу внутри MEDIA_ROOT или None, если файла нет."""
+    source_path = safe_join(settings.MEDIA_ROOT, path)
+    if not os.path.isfile(source_path):
+        return None
+    return source_path
+
+
+def get_cache_key(source_path, width, height):
+    stat = os.stat(source_path)
+    fingerprint = f'{source_path}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}'
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def get_cache_path(cache_key, extension):
+    return os.path.join(settings.RESIZE_CACHE_DIR, cache_key[:2], f'{cache_key}.{extension}')
+
+
+def get_output_format(source_path):
+    _, extension = os.path.splitext(source_path)
+    return RESIZE_FORMATS.get(extension.lower(), ('PNG', 'png'))
+
+
+def resize_to_file(source_path, width, height, target_path):
+    image_format, _ = get_output_format(source_path)
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((width, height), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        content = encode_image(image, image_format)
+
+    target_dir = os.path.dirname(target_path)
+    with tempfile.NamedTemporaryFile(dir=target_dir, delete=False) as temporary_file:
+        temporary_file.write(content)
+    os.replace(temporary_file.name, target_path)
+
+
+def evict_resized_images(keep=None):
+    """Удаляет давно не запрошенные картинки, пока кэш больше RESIZE_CACHE_EVICT_TO от RESIZE_CACHE_MAX_BYTES.
+
+    Возвращает размер кэша после вытеснения.
+    """
+    entries = []
+    total_size = 0
+    for directory in os.scandir(settings.RESIZE_CACHE_DIR):
+        if not directory.is_dir():
+            continue
+        for entry in os.scandir(directory.path):
+            if entry.name.endswith('.lock') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            total_size += stat.st_size
+            if entry.path != keep:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= settings.RESIZE_CACHE_MAX_BYTES * RESIZE_CACHE_EVICT_TO:
+            break
+        for stale_path in [path, f'{os.path.splitext(path)[0]}.lock']:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+        total_size -= size
+    return total_size
+
+
+def add_to_cache_size(path):
+    """Прибавляет новую картинку к размеру кэша и вытесняет старые, только если он превышен.
+
+    Размер хранится в общем кэше Django. Если там его нет, размер узнаётся
+    обходом папки, как и при превышении.
+    """
+    try:
+        total_size = cache.incr(RESIZE_CACHE_SIZE_KEY, os.path.getsize(path))
+    except ValueError:
+        total_size = None
+    if total_size is not None and total_size <= settings.RESIZE_CACHE_MAX_BYTES:
+        return
+    with locked(os.path.join(settings.RESIZE_CACHE_DIR, 'evict.lock')):
+        cache.set(RESIZE_CACHE_SIZE_KEY, evict_resized_images(keep=path), timeout=None)
+
+
+def open_resized_image(source_path, width, height, cache_key):
+    """Открывает уменьшенную картинку, создавая её при первом запросе.
+
+    Параллельные запросы одной картинки ждут на блокировке, и картинку уменьшает
+    только первый из них. Время изменения файла обновляется при каждом обращении,
+    по нему вытесняются давно не запрошенные картинки.
+    """
+    _, extension = get_output_format(source_path)
+    cache_path = get_cache_path(cache_key, extension)
+
+    try:
+        resized_file = open(cache_path, 'rb')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with locked(f'{os.path.splitext(cache_path)[0]}.lock'):
+            is_new = not os.path.exists(cache_path)
+            if is_new:
+                resize_to_file(source_path, width, height, cache_path)
+            resized_file = open(cache_path, 'rb')
+        if is_new:
+            add_to_cache_size(cache_path)
+    else:
+        os.utime(cache_path)
+    return resized_file
@@ -0,0 +1,113 @@
+import json
+import re
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.text import compress_string
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIN_COMPRESSED_LENGTH = 200
+
+accepts_gzip_re = re.compile(r'\bgzip\b')
+accepts_brotli_re = re.compile(r'\bbr\b')
+
+
+def encode_default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return DjangoJSONEncoder().default(obj)
+
+
+def dumps(data, pretty=False):
+    if pretty:
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4).encode()
+    if orjson:
+        return orjson.dumps(data, default=encode_default)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def negotiate_encoding(request, content):
+    if len(content) < MIN_COMPRESSED_LENGTH:
+        return None
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if brotli and accepts_brotli_re.search(accept_encoding):
+        return 'br'
+    if accepts_gzip_re.search(accept_encoding):
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content)
+    if encoding == 'gzip':
+        return compress_string(content)
+    return content
+
+
+def strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def matches_if_none_match(request, etag):
+    """Совпадает ли etag с If-None-Match: список тегов, «*» и слабые теги сравниваются по RFC 7232."""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if etags == ['*']:
+        return True
+    return strip_weak(etag) in {strip_weak(tag) for tag in etags}
+
+
+class FastJsonResponse(HttpResponse):
+    def __init__(self, data=None, content=None, encoding=None, compressed=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        if compressed is None:
+            if content is None:
+                content = dumps(data)
+            compressed = compress(content, encoding)
+        super().__init__(compressed, **kwargs)
+        if encoding:
+            self['Content-Encoding'] = encoding
+        patch_vary_headers(self, ['Accept-Encoding'])
+
+
+def json_response(request, data=None, content=None, etag=None, get_compressed=None):
+    """Компактный JSON-ответ, сжатый под Accept-Encoding клиента.
+
+    С ?pretty=1 отдаёт JSON с отступами для отладки.
+    Если передан etag, отвечает 304 на совпадающий If-None-Match.
+    get_compressed(encoding) может вернуть заранее сжатый content, чтобы не сжимать его на каждый запрос.
+    """
+    if request.GET.get('pretty') == '1':
+        if content is not None:
+            data = json.loads(content)
+        content = dumps(data, pretty=True)
+        etag = None
+        get_compressed = None
+    elif content is None:
+        content = dumps(data)
+
+    encoding = negotiate_encoding(request, content)
+    if etag and encoding:
+        etag = f'{etag[:-1]}-{encoding}"'
+    if etag and matches_if_none_match(request, etag):
+        response = HttpResponseNotModified()
+        patch_vary_headers(response, ['Accept-Encoding'])
+    else:
+        compressed = get_compressed(encoding) if get_compressed and encoding else None
+        response = FastJsonResponse(content=content, encoding=encoding, compressed=compressed)
+    if etag:
+        response['ETag'] = etag
+    return response
@@ -0,0 +1,63 @@
+from django.db import IntegrityError, transaction
+
+from .candidates import add_new_order_candidates, schedule_candidates_update
+from .catalogue import invalidate_catalogue
+from .models import OrderDetails, OrderIdempotencyKey, OrderItem, Product, Restaurant, RestaurantMenuItem
+
+
+def get_products(product_ids):
+    return Product.objects.in_bulk(set(product_ids))
+
+
+def create_order(order_fields, order_lines):
+    """Создаёт заказ и все его позиции.
+
+    order_lines — список словарей с ключами product (объект Product) и quantity.
+    """
+    order_items = [
+        OrderItem(
+            product=line['product'],
+            quantity=line['quantity'],
+            position_cost=line['product'].price * line['quantity'],
+        )
+        for line in order_lines
+    ]
+    order = OrderDetails.objects.create(
+        **order_fields,
+        total_cost=sum(order_item.position_cost for order_item in order_items),
+    )
+    for order_item in order_items:
+        order_item.order = order
+    OrderItem.objects.bulk_create(order_items)
+    # в той же транзакции, что и заказ: геокодер запустится только после коммита
+    add_new_order_candidates(order, [order_item.product_id for order_item in order_items])
+    return order
+
+
+def claim_idempotency_key(key, request_hash):
+    """Занимает ключ идемпотентности, возвращает (запись, занят_ли_ключ_раньше).
+
+    Вызывается внутри транзакции: параллельный запрос с тем же ключом ждёт
+    на уникальном индексе, пока первый не завершится, и получает его запись.
+    """
+    try:
+        with transaction.atomic():
+            return OrderIdempotencyKey.objects.create(key=key, request_hash=request_hash), False
+    except IntegrityError:
+        return OrderIdempotencyKey.objects.select_for_update().get(key=key), True
+
+
+@transaction.atomic
+def set_product_availability(product, availability):
+    """Включает или выключает товар сразу во всех ресторанах."""
+    RestaurantMenuItem.objects.filter(product=product).update(availability=availability)
+    if availability:
+        RestaurantMenuItem.objects.bulk_create(
+            [
+                RestaurantMenuItem(restaurant_id=restaurant_id, product=product)
+                for restaurant_id in Restaurant.objects.values_list('id', flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+    transaction.on_commit(invalidate_catalogue)
+    schedule_candidates_update(product_ids=[product.id])
@@ -0,0 +1,134 @@
+import sys
+
+import rollbar
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from place.models import Place
+
+from .banners import invalidate_banners
+from .candidates import schedule_candidates_update, update_candidates_for_place
+from .catalogue import invalidate_catalogue
+from .distances import distance_cache
+from .images import delete_image_derivatives, has_fresh_derivatives, make_image_derivatives
+from .spatial import invalidate_restaurant_index
+from .models import Banner, OrderDetails, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .places import is_place_linked, link_order_place, link_restaurant_place
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def invalidate_catalogue_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_catalogue)
+
+
+@receiver(post_save, sender=Product)
+def make_image_derivatives_on_save(sender, instance, **kwargs):
+    if not instance.image or has_fresh_derivatives(instance):
+        return
+    try:
+        derivatives = make_image_derivatives(instance.image)
+    except (OSError, ValueError):
+        rollbar.report_exc_info(sys.exc_info())
+        return
+
+    stale_derivatives = instance.image_derivatives
+    Product.objects.filter(pk=instance.pk).update(image_derivatives=derivatives)
+    instance.image_derivatives = derivatives
+    transaction.on_commit(lambda: delete_image_derivatives(stale_derivatives, keep=derivatives))
+    transaction.on_commit(invalidate_catalogue)
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def invalidate_banners_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_banners)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def update_order_total_cost(sender, instance, **kwargs):
+    OrderDetails.objects.filter(pk=instance.order_id).update_total_cost()
+    schedule_candidates_update(order_ids=[instance.order_id])
+
+
+def get_menu_item_state(menu_item):
+    return tuple(menu_item.__dict__.get(field) for field in ['restaurant_id', 'product_id', 'availability'])
+
+
+@receiver(post_init, sender=RestaurantMenuItem)
+def remember_menu_item_state(sender, instance, **kwargs):
+    instance.saved_state = get_menu_item_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+def update_candidates_on_menu_change(sender, instance, **kwargs):
+    saved_state = instance.saved_state
+    state = get_menu_item_state(instance)
+    instance.saved_state = state
+    if saved_state == state:
+        return
+    was_available = bool(saved_state and saved_state[2])
+    if not was_available and not instance.availability:
+        return
+    product_ids = {instance.product_id}
+    if saved_state:
+        product_ids.add(saved_state[1])
+    schedule_candidates_update(product_ids=product_ids)
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def update_candidates_on_menu_delete(sender, instance, **kwargs):
+    if instance.availability:
+        schedule_candidates_update(product_ids=[instance.product_id])
+
+
+@receiver(post_save, sender=Restaurant)
+def link_restaurant_place_on_save(sender, instance, update_fields, **kwargs):
+    if update_fields and 'address' not in update_fields:
+        return
+    if not is_place_linked(instance):
+        link_restaurant_place(instance.id, instance.address)
+
+
+@receiver(post_save, sender=OrderDetails)
+def link_order_place_on_save(sender, instance, update_fields, **kwargs):
+    if update_fields and 'address' not in update_fields:
+        return
+    if not is_place_linked(instance):
+        link_order_place(instance.id, instance.address)
+
+
+@receiver(post_delete, sender=Restaurant)
+def invalidate_index_on_restaurant_delete(sender, **kwargs):
+    transaction.on_commit(invalidate_restaurant_index)
+
+
+@receiver(post_delete, sender=Place)
+def invalidate_index_on_place_delete(sender, instance, **kwargs):
+    if Restaurant.objects.filter(place=instance).exists():
+        transaction.on_commit(invalidate_restaurant_index)
+
+
+def get_place_coordinates(place):
+    return place.__dict__.get('lat'), place.__dict__.get('lon')
+
+
+@receiver(post_init, sender=Place)
+def remember_place_coordinates(sender, instance, **kwargs):
+    instance.saved_coordinates = get_place_coordinates(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Place)
+def invalidate_distances_on_place_move(sender, instance, created, update_fields, **kwargs):
+    if update_fields and not {'lat', 'lon'} & set(update_fields):
+        return
+    saved_coordinates = instance.saved_coordinates
+    instance.saved_coordinates = get_place_coordinates(instance)
+    if created or saved_coordinates == instance.saved_coordinates:
+        return
+
+    if Restaurant.objects.filter(place=instance).exists():
+        transaction.on_commit(invalidate_restaurant_index)
+    distance_cache.invalidate_place(instance.id)
+    transaction.on_commit(lambda: update_candidates_for_place(instance.id))
@@ -0,0 +1,117 @@
+import threading
+
+import numpy as np
+
+from place.utils import get_bounding_box, parse_coordinates
+
+from .cache_versions import bump_version, get_version
+from .matching import EARTH_RADIUS_KM
+from .models import Restaurant
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+RESTAURANT_INDEX_VERSION_KEY = 'foodcartapp:restaurant_index:version'
+
+loaded_indexes = {}
+loaded_indexes_lock = threading.Lock()
+
+
+def to_unit_vectors(coordinates):
+    coordinates = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))
+    lat, lon = coordinates[:, 0], coordinates[:, 1]
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(min(km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+class RestaurantSpatialIndex:
+    """Поиск ближайших ресторанов по евклидовой хорде между точками на единичной сфере.
+
+    Хорда монотонна по расстоянию вдоль поверхности, поэтому порядок соседей
+    и отсечение по радиусу совпадают с геодезическими.
+    """
+
+    def __init__(self, restaurants, coordinates):
+        self.restaurants = list(restaurants)
+        self.points = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        self.vectors = to_unit_vectors(self.points) if self.restaurants else np.empty((0, 3))
+        self.tree = cKDTree(self.vectors) if cKDTree and self.restaurants else None
+
+    @classmethod
+    def from_db(cls):
+        restaurants = Restaurant.objects.select_related('place').filter(place__isnull=False).order_by('id')
+        located = [
+            (restaurant, parse_coordinates(restaurant.place.lat, restaurant.place.lon))
+            for restaurant in restaurants
+        ]
+        located = [(restaurant, coordinates) for restaurant, coordinates in located if coordinates]
+        return cls(
+            [restaurant for restaurant, _ in located],
+            [coordinates for _, coordinates in located],
+        )
+
+    def nearest(self, coordinates, k=None, radius_km=None, restaurant_ids=None):
+        """Возвращает [(restaurant, distance_km), ...] по возрастанию расстояния."""
+        if not self.restaurants:
+            return []
+        point = to_unit_vectors(coordinates)[0]
+        max_chord = km_to_chord(radius_km) if radius_km is not None else np.inf
+
+        if self.tree is not None:
+            chords, positions = self.tree.query(
+                point,
+                k=len(self.restaurants),
+                distance_upper_bound=max_chord,
+            )
+            chords, positions = np.atleast_1d(chords), np.atleast_1d(positions)
+            found = np.isfinite(chords)
+            chords, positions = chords[found], positions[found]
+        else:
+            positions = np.arange(len(self.restaurants))
+            if radius_km is not None:
+                min_lat, max_lat, min_lon, max_lon = get_bounding_box(*coordinates, radius_km)
+                lat, lon = self.points[:, 0], self.points[:, 1]
+                positions = np.flatnonzero(
+                    (min_lat <= lat) & (lat <= max_lat) & (min_lon <= lon) & (lon <= max_lon)
+                )
+            chords = np.linalg.norm(self.vectors[positions] - point, axis=1)
+            order = np.argsort(chords, kind='stable')
+            chords, positions = chords[order], positions[order]
+            within_radius = chords <= max_chord
+            chords, positions = chords[within_radius], positions[within_radius]
+
+        nearest_restaurants = []
+        for distance, position in zip(chord_to_km(chords), positions):
+            restaurant = self.restaurants[position]
+            if restaurant_ids is not None and restaurant.id not in restaurant_ids:
+                continue
+            nearest_restaurants.append((restaurant, float(distance)))
+            if k is not None and len(nearest_restaurants) >= k:
+                break
+        return nearest_restaurants
+
+
+def get_restaurant_index():
+    version = get_version(RESTAURANT_INDEX_VERSION_KEY)
+    with loaded_indexes_lock:
+        index = loaded_indexes.get(version)
+    if index is None:
+        index = RestaurantSpatialIndex.from_db()
+        with loaded_indexes_lock:
+            loaded_indexes.clear()
+            loaded_indexes[version] = index
+    return index
+
+
+def invalidate_restaurant_index():
+    bump_version(RESTAURANT_INDEX_VERSION_KEY)
@@ -0,0 +1,365 @@
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from place.geocoding import geocode_place
+from place.models import Place, PlaceDistance
+
+from .candidates import schedule_candidates_update, update_order_candidates
+from .dispatch import assign_greedy
+from .matching import RestaurantMatcher
+from .models import (
+    OrderCandidateRestaurant,
+    OrderDetails,
+    OrderIdempotencyKey,
+    Product,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .responses import matches_if_none_match
+from .services import claim_idempotency_key, create_order
+from .utils import CircuitBreaker, GeocoderUnavailable, YandexGeocoder
+
+
+class RestaurantMatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.restaurants = [Restaurant(id=restaurant_id) for restaurant_id in [1, 2, 3]]
+        self.matcher = RestaurantMatcher(
+            self.restaurants,
+            [(1, 10), (1, 20), (2, 10), (3, 20), (3, 10), (99, 10)],
+        )
+
+    def test_capable_positions_keep_restaurants_with_every_product(self):
+        self.assertEqual(self.matcher.capable_positions([10]), [0, 1, 2])
+        self.assertEqual(self.matcher.capable_positions([10, 20]), [0, 2])
+        self.assertEqual(self.matcher.capable_positions([10, 20, 10]), [0, 2])
+
+    def test_capable_positions_are_empty_for_unknown_or_no_products(self):
+        self.assertEqual(self.matcher.capable_positions([10, 30]), [])
+        self.assertEqual(self.matcher.capable_positions([]), [])
+
+    def test_match_sorts_by_distance_and_puts_unknown_last(self):
+        distances = {
+            (self.restaurants[0], 'home'): 5.0,
+            (self.restaurants[1], 'home'): None,
+            (self.restaurants[2], 'home'): 1.5,
+        }
+        get_distances = mock.Mock(side_effect=lambda pairs: {pair: distances[pair] for pair in pairs})
+
+        matches = self.matcher.match([(100, [10], 'home'), (200, [30], 'home')], get_distances)
+
+        self.assertEqual(
+            [(match.restaurant.id, match.distance) for match in matches[100]],
+            [(3, 1.5), (1, 5.0), (2, None)],
+        )
+        self.assertEqual(matches[200], [])
+        get_distances.assert_called_once()
+
+    def test_match_skips_distances_when_nobody_can_cook(self):
+        get_distances = mock.Mock()
+
+        matches = self.matcher.match([(100, [30], 'home')], get_distances)
+
+        self.assertEqual(matches, {100: []})
+        get_distances.assert_not_called()
+
+
+class AssignGreedyTests(SimpleTestCase):
+    def assign(self, candidates, capacities):
+        order_ids, restaurant_ids, distances = (np.array(column) for column in zip(*candidates))
+        return assign_greedy(order_ids, restaurant_ids, distances, capacities)
+
+    def test_full_restaurant_passes_order_to_next_nearest(self):
+        candidates = [(1, 10, 1.0), (1, 20, 5.0), (2, 10, 2.0), (2, 20, 6.0)]
+
+        self.assertEqual(self.assign(candidates, {10: 1, 20: 5}), {1: 10, 2: 20})
+
+    def test_shortest_distance_wins_the_last_slot(self):
+        candidates = [(1, 10, 3.0), (2, 10, 1.0)]
+
+        self.assertEqual(self.assign(candidates, {10: 1}), {2: 10})
+
+    def test_restaurants_without_capacity_get_nothing(self):
+        candidates = [(1, 10, 1.0), (2, 20, 1.0), (3, 30, 1.0)]
+
+        self.assertEqual(self.assign(candidates, {10: 0, 20: -2}), {})
+
+    def test_each_order_gets_one_restaurant(self):
+        candidates = [(1, 10, 1.0), (1, 20, 2.0)]
+
+        self.assertEqual(self.assign(candidates, {10: 5, 20: 5}), {1: 10})
+
+
+@mock.patch('foodcartapp.utils.monotonic')
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.record_failure()
+
+    def test_stays_closed_below_threshold(self, monotonic):
+        monotonic.return_value = 100
+        self.fail(2)
+
+        self.breaker.check()
+
+    def test_opens_after_threshold_failures(self, monotonic):
+        monotonic.return_value = 100
+        self.fail(3)
+
+        monotonic.return_value = 129
+        with self.assertRaises(GeocoderUnavailable):
+            self.breaker.check()
+
+    def test_lets_one_trial_request_through_after_timeout(self, monotonic):
+        monotonic.return_value = 100
+        self.fail(3)
+
+        monotonic.return_value = 130
+        self.breaker.check()
+        with self.assertRaises(GeocoderUnavailable):
+            self.breaker.check()
+
+    def test_failed_trial_opens_again(self, monotonic):
+        monotonic.return_value = 100
+        self.fail(3)
+        monotonic.return_value = 130
+        self.breaker.check()
+        self.fail(1)
+
+        monotonic.return_value = 159
+        with self.assertRaises(GeocoderUnavailable):
+            self.breaker.check()
+
+    def test_success_closes_and_resets_failures(self, monotonic):
+        monotonic.return_value = 100
+        self.fail(3)
+        monotonic.return_value = 130
+        self.breaker.check()
+        self.breaker.record_success()
+
+        self.breaker.check()
+        self.fail(2)
+        self.breaker.check()
+
+
+class YandexGeocoderTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=1)
+        self.geocoder = YandexGeocoder('apikey', circuit_breaker=self.breaker)
+        self.response = mock.Mock()
+        self.geocoder.session = mock.Mock(**{'get.return_value': self.response})
+
+    def reply(self, payload):
+        self.response.json.return_value = payload
+
+    def test_returns_coordinates_of_most_relevant_place(self):
+        self.reply({'response': {'GeoObjectCollection': {'featureMember': [
+            {'GeoObject': {'Point': {'pos': '37.61 55.75'}}},
+            {'GeoObject': {'Point': {'pos': '30.31 59.93'}}},
+        ]}}})
+
+        self.assertEqual(self.geocoder.fetch_coordinates('Москва'), ('55.75', '37.61'))
+
+    def test_returns_none_when_nothing_found(self):
+        self.reply({'response': {'GeoObjectCollection': {'featureMember': []}}})
+
+        self.assertIsNone(self.geocoder.fetch_coordinates('Нигде'))
+        self.breaker.check()
+
+    def test_unexpected_body_counts_as_failure(self):
+        bodies = [
+            ValueError('not json'),
+            None,
+            {'error': 'bad key'},
+            {'response': {'GeoObjectCollection': {'featureMember': [{'GeoObject': {'Point': {'pos': ''}}}]}}},
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.breaker.record_success()
+                self.response.json.side_effect = body if isinstance(body, Exception) else None
+                self.reply(body)
+
+                with self.assertRaises(GeocoderUnavailable):
+                    self.geocoder.fetch_coordinates('Москва')
+                with self.assertRaises(GeocoderUnavailable):
+                    self.breaker.check()
+
+
+class IfNoneMatchTests(SimpleTestCase):
+    def matches(self, header, etag='"abc"'):
+        return matches_if_none_match(RequestFactory().get('/', HTTP_IF_NONE_MATCH=header), etag)
+
+    def test_matches_tag_in_list(self):
+        self.assertTrue(self.matches('"xyz", "abc"'))
+
+    def test_matches_any_tag(self):
+        self.assertTrue(self.matches('*'))
+
+    def test_compares_weak_tags_weakly(self):
+        self.assertTrue(self.matches('W/"abc"'))
+        self.assertTrue(self.matches('"abc"', etag='W/"abc"'))
+
+    def test_does_not_match_other_tags(self):
+        self.assertFalse(self.matches('"abcd", "xyz"'))
+        self.assertFalse(self.matches(''))
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Чизбургер', price=100)
+
+    def order_payload(self, address='Москва, Тверская 1'):
+        return {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79291000000',
+            'address': address,
+            'products': [{'product': self.product.id, 'quantity': 2}],
+        }
+
+    def post_order(self, payload, key):
+        return self.client.post(
+            '/api/order/',
+            payload,
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_claim_creates_record_once(self):
+        key_record, replayed = claim_idempotency_key('key-1', 'hash-1')
+        self.assertFalse(replayed)
+
+        same_record, replayed = claim_idempotency_key('key-1', 'hash-2')
+        self.assertTrue(replayed)
+        self.assertEqual(same_record.pk, key_record.pk)
+        self.assertEqual(same_record.request_hash, 'hash-1')
+
+    def test_repeated_request_replays_first_response(self):
+        first = self.post_order(self.order_payload(), 'key-1')
+        second = self.post_order(self.order_payload(), 'key-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(OrderDetails.objects.count(), 1)
+
+    def test_key_reused_for_another_order_is_rejected(self):
+        self.post_order(self.order_payload(), 'key-1')
+        response = self.post_order(self.order_payload(address='Москва, Арбат 1'), 'key-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(OrderDetails.objects.count(), 1)
+        self.assertEqual(OrderIdempotencyKey.objects.get().order.address, 'Москва, Тверская 1')
+
+
+class PlaceInvalidationTests(TestCase):
+    def setUp(self):
+        self.restaurant_place = Place.objects.create(address='москва, арбат 1', lat=55.75, lon=37.59)
+        self.order_place = Place.objects.create(address='москва, тверская 1', lat=55.76, lon=37.61)
+        Restaurant.objects.create(name='Star Burger', address='Москва, Арбат 1', place=self.restaurant_place)
+        PlaceDistance.objects.create(
+            restaurant_place=self.restaurant_place,
+            order_place=self.order_place,
+            distance=1.5,
+        )
+
+    def refresh(self, coordinates):
+        with mock.patch('place.geocoding.get_geocoder') as get_geocoder:
+            get_geocoder.return_value.fetch_coordinates.return_value = coordinates
+            with self.captureOnCommitCallbacks() as callbacks:
+                geocode_place(self.restaurant_place.address, Place.objects.get(pk=self.restaurant_place.pk))
+        return callbacks
+
+    def test_refresh_with_same_coordinates_keeps_distances(self):
+        callbacks = self.refresh(('55.75', '37.59'))
+
+        self.assertEqual(callbacks, [])
+        self.assertTrue(PlaceDistance.objects.exists())
+
+    def test_refresh_that_finds_nothing_keeps_distances(self):
+        callbacks = self.refresh(None)
+
+        self.assertEqual(callbacks, [])
+        self.assertTrue(PlaceDistance.objects.exists())
+
+    def test_saving_place_without_moving_keeps_distances(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            place = Place.objects.get(pk=self.restaurant_place.pk)
+            place.save()
+
+        self.assertEqual(callbacks, [])
+        self.assertTrue(PlaceDistance.objects.exists())
+
+    def test_moved_place_drops_distances_and_recomputes(self):
+        callbacks = self.refresh(('55.70', '37.50'))
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertFalse(PlaceDistance.objects.exists())
+
+
+class CandidatesUpdateTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Чизбургер', price=100)
+        self.restaurants = [
+            Restaurant.objects.create(name=f'Star Burger {number}', address=f'Москва, Арбат {number}')
+            for number in [1, 2]
+        ]
+        for restaurant in self.restaurants:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=self.product)
+        self.order = create_order(
+            {'firstname': 'Иван', 'lastname': 'Петров', 'phonenumber': '+79291000000', 'address': 'Москва, Тверская 1'},
+            [{'product': self.product, 'quantity': 1}],
+        )
+        self.past = timezone.now() - timedelta(minutes=1)
+        OrderDetails.objects.update(updated_at=self.past)
+
+    def get_candidate_ids(self):
+        return set(OrderCandidateRestaurant.objects.filter(order=self.order).values_list('restaurant_id', flat=True))
+
+    def test_new_order_gets_candidates_without_distance(self):
+        self.assertEqual(self.get_candidate_ids(), {restaurant.id for restaurant in self.restaurants})
+        self.assertFalse(OrderCandidateRestaurant.objects.filter(distance__isnull=False).exists())
+
+    def test_unchanged_candidates_keep_updated_at(self):
+        update_order_candidates(OrderDetails.objects.all())
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.updated_at, self.past)
+
+    def test_changed_candidates_bump_updated_at(self):
+        RestaurantMenuItem.objects.filter(restaurant=self.restaurants[0]).update(availability=False)
+
+        update_order_candidates(OrderDetails.objects.all())
+
+        self.order.refresh_from_db()
+        self.assertGreater(self.order.updated_at, self.past)
+        self.assertEqual(self.get_candidate_ids(), {self.restaurants[1].id})
+
+    @mock.patch('foodcartapp.candidates.update_order_candidates')
+    def test_scheduled_updates_run_once_per_commit(self, update):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_candidates_update(product_ids=[self.product.id])
+            schedule_candidates_update(order_ids=[self.order.id])
+
+        update.assert_called_once()
+        self.assertEqual(list(update.call_args.args[0]), [self.order])
+
+    @mock.patch('foodcartapp.candidates.update_order_candidates')
+    def test_rolled_back_update_runs_with_next_commit(self, update):
+        with self.assertRaises(ValueError), transaction.atomic():
+            schedule_candidates_update(order_ids=[self.order.id])
+            raise ValueError
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_candidates_update(order_ids=[])
+
+        update.assert_called_once()
+        self.assertEqual(list(update.call_args.args[0]), [self.order])
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order, show_rest
+from .views import product_list_api, banners_list_api, register_order, show_rest, nearest_restaurants
 
 
 app_name = "foodcartapp"
@@ -10,4 +10,5 @@ urlpatterns = [
     path('banners/', banners_list_api),
     path('order/', register_order),
     path('rest/', show_rest),
+    path('rest/nearest/', nearest_restaurants),
 ]
@@ -1,19 +1,105 @@
+import hashlib
+import threading
+from time import monotonic
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class GeocoderUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """После failure_threshold ошибок подряд отказывает без запроса reset_timeout секунд.
+
+    Затем пропускает один пробный запрос: успех закрывает цепь, ошибка снова её размыкает.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if monotonic() - self.opened_at < self.reset_timeout:
+                raise GeocoderUnavailable('Геокодер недоступен, запросы временно не отправляются')
+            self.opened_at = monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
 
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = monotonic()
 
-def fetch_coordinates(apikey, address):
+
+class YandexGeocoder:
     base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
-
-    if not found_places:
-        return None
-
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lat, lon
+
+    def __init__(
+        self,
+        apikey,
+        connect_timeout=3.05,
+        read_timeout=5,
+        retries=2,
+        backoff_factor=0.3,
+        pool_size=10,
+        circuit_breaker=None,
+    ):
+        self.apikey = apikey
+        self.timeout = (connect_timeout, read_timeout)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=pool_size, max_retries=retry))
+
+    def fetch_coordinates(self, address):
+        self.circuit_breaker.check()
+        try:
+            response = self.session.get(self.base_url, params={
+                "geocode": address,
+                "apikey": self.apikey,
+                "format": "json",
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+            if found_places:
+                lon, lat = found_places[0]['GeoObject']['Point']['pos'].split(" ")
+        except (requests.RequestException, ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+            # неожиданный ответ считаем такой же неисправностью геокодера, как и сетевую ошибку
+            self.circuit_breaker.record_failure()
+            raise GeocoderUnavailable(repr(error)) from error
+        self.circuit_breaker.record_success()
+
+        if not found_places:
+            return None
+        return lat, lon
+
+
+class StubGeocoder:
+    """Офлайн-геокодер: детерминированные координаты внутри Москвы."""
+
+    def __init__(self, apikey=None):
+        pass
+
+    def fetch_coordinates(self, address):
+        digest = hashlib.md5(address.encode()).digest()
+        lat = 55.55 + digest[0] / 255 * 0.35
+        lon = 37.35 + digest[1] / 255 * 0.5
+        return f'{lat:.6f}', f'{lon:.6f}'
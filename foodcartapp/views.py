@@ -1,72 +1,77 @@
+import hashlib
+import json
+import mimetypes
 import sys
 
-from django.http import JsonResponse
+from django.core.exceptions import SuspiciousFileOperation
 from django.db import transaction
-from django.templatetags.static import static
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from PIL import Image
 from rest_framework import status
-from rest_framework.fields import IntegerField
-
-from .models import Product, OrderItem, OrderDetails, Restaurant
-from place.models import Place
+from rest_framework.fields import CharField, FloatField, IntegerField, ListField
+
+from .banners import get_active_banners
+from .catalogue import get_catalogue, get_compressed_catalogue
+from .matching import RestaurantMatcher
+from .models import OrderItem, OrderDetails, Restaurant
+from .resize import RESIZE_SIZES, get_cache_key, get_source_path, open_resized_image
+from .responses import json_response, matches_if_none_match
+from .services import claim_idempotency_key, create_order, get_products
+from .spatial import get_restaurant_index
+from .utils import GeocoderUnavailable
+from place.geocoding import get_coordinates
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer
-from foodcartapp.utils import fetch_coordinates
-from django.conf import settings
+from rest_framework.serializers import ModelSerializer, Serializer, ValidationError
 import rollbar
 
 
+MAX_NEAREST_RESTAURANTS = 20
+RESIZED_IMAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return json_response(request, get_active_banners())
+
+
+def resize_media_image(request, width, height, path):
+    if (width, height) not in RESIZE_SIZES:
+        raise Http404
+    try:
+        source_path = get_source_path(path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not source_path:
+        raise Http404
+
+    cache_key = get_cache_key(source_path, width, height)
+    etag = f'"{cache_key}"'
+    if matches_if_none_match(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            resized_file = open_resized_image(source_path, width, height, cache_key)
+        except (OSError, Image.DecompressionBombError):
+            raise Http404
+        content_type, _ = mimetypes.guess_type(resized_file.name)
+        response = FileResponse(resized_file, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = RESIZED_IMAGE_CACHE_CONTROL
+    return response
 
 
 def product_list_api(request):
     try:
-        products = Product.objects.select_related('category').available()
-
-        dumped_products = []
-        for product in products:
-            dumped_product = {
-                'id': product.id,
-                'name': product.name,
-                'price': product.price,
-                'special_status': product.special_status,
-                'description': product.description,
-                'category': {
-                    'id': product.category.id,
-                    'name': product.category.name,
-                },
-                'image': product.image.url,
-                'restaurant': {
-                    'id': product.id,
-                    'name': product.name,
-                }
-            }
-            dumped_products.append(dumped_product)
-        return JsonResponse(dumped_products, safe=False, json_dumps_params={
-            'ensure_ascii': False,
-            'indent': 4,
-        })
+        content, etag = get_catalogue()
+        response = json_response(
+            request,
+            content=content,
+            etag=etag,
+            get_compressed=lambda encoding: get_compressed_catalogue(content, etag, encoding),
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
     except:
         rollbar.report_exc_info(sys.exc_info())
 
@@ -93,7 +98,52 @@ def show_rest(request):
     return Response(dumped_restaurant)
 
 
+class NearestRestaurantsSerializer(Serializer):
+    address = CharField(max_length=100)
+    products = ListField(child=IntegerField(min_value=1), required=False)
+    k = IntegerField(min_value=1, max_value=MAX_NEAREST_RESTAURANTS, default=5)
+    radius = FloatField(min_value=0, required=False)
+
+
+@api_view(['GET'])
+def nearest_restaurants(request):
+    serializer = NearestRestaurantsSerializer(data=request.GET)
+    serializer.is_valid(raise_exception=True)
+    try:
+        coordinates = get_coordinates(serializer.validated_data['address'])
+    except GeocoderUnavailable:
+        return Response({'address': ['Геокодер временно недоступен']}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if not coordinates:
+        return Response({'address': ['Адрес не найден']}, status=status.HTTP_400_BAD_REQUEST)
+
+    restaurant_ids = None
+    if serializer.validated_data.get('products'):
+        matcher = RestaurantMatcher.from_db(product_ids=serializer.validated_data['products'])
+        restaurant_ids = {
+            matcher.restaurants[position].id
+            for position in matcher.capable_positions(serializer.validated_data['products'])
+        }
+
+    nearest = get_restaurant_index().nearest(
+        coordinates,
+        k=serializer.validated_data['k'],
+        radius_km=serializer.validated_data.get('radius'),
+        restaurant_ids=restaurant_ids,
+    )
+    return Response([
+        {
+            'id': restaurant.id,
+            'name': restaurant.name,
+            'address': restaurant.address,
+            'distance': round(distance, 3),
+        }
+        for restaurant, distance in nearest
+    ])
+
+
 class OrderItemSerializer(ModelSerializer):
+    product = IntegerField(min_value=1)
+
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
@@ -106,6 +156,16 @@ class OrderDetailsSerializer(ModelSerializer):
         model = OrderDetails
         fields = ['products', 'firstname', 'lastname', 'phonenumber', 'address']
 
+    def validate_products(self, order_lines):
+        products = get_products(line['product'] for line in order_lines)
+        missing_ids = {line['product'] for line in order_lines} - products.keys()
+        if missing_ids:
+            raise ValidationError(f'Недопустимые первичные ключи продуктов: {sorted(missing_ids)}')
+        return [
+            {**line, 'product': products[line['product']]}
+            for line in order_lines
+        ]
+
 
 @api_view(['POST'])
 @transaction.atomic
@@ -113,27 +173,39 @@ def register_order(request):
     try:
         serializer = OrderDetailsSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        customer_order = OrderDetails.objects.create(
-            firstname=serializer.validated_data['firstname'],
-            lastname=serializer.validated_data['lastname'],
-            phonenumber=serializer.validated_data['phonenumber'],
-            address=serializer.validated_data['address']
-        )
-        for product in serializer.validated_data['products']:
-            OrderItem.objects.create(
-                order=customer_order,
-                product=product['product'],
-                quantity=product['quantity'],
-                position_cost=product['product'].price * product['quantity']
-            )
-
-        place = Place.objects.get_or_create(
-            address=serializer.validated_data['address'],
-            lat=fetch_coordinates(settings.YANDEX_GEOCODE_APIKEY, serializer.validated_data['address'])[0],
-            lon=fetch_coordinates(settings.YANDEX_GEOCODE_APIKEY, serializer.validated_data['address'])[1],
-        )
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return Response(
+                    {'Idempotency-Key': [f'Ключ длиннее {IDEMPOTENCY_KEY_MAX_LENGTH} символов']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            request_hash = hashlib.sha256(
+                json.dumps(request.data, sort_keys=True, ensure_ascii=False).encode()
+            ).hexdigest()
+            key_record, replayed = claim_idempotency_key(idempotency_key, request_hash)
+            if replayed and key_record.request_hash != request_hash:
+                return Response(
+                    {'Idempotency-Key': ['Ключ уже использован для другого заказа']},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if replayed and key_record.response is not None:
+                response = Response(key_record.response, status=status.HTTP_200_OK)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+        order_fields = {
+            field: serializer.validated_data[field]
+            for field in ['firstname', 'lastname', 'phonenumber', 'address']
+        }
+        customer_order = create_order(order_fields, serializer.validated_data['products'])
 
         order_details = {'id': customer_order.id, **serializer.data, }
+        if idempotency_key:
+            key_record.order = customer_order
+            key_record.response = order_details
+            key_record.save(update_fields=['order', 'response'])
         return Response(order_details, status=status.HTTP_200_OK)
     except:
         rollbar.report_exc_info(sys.exc_info())
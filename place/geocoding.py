@@ -0,0 +1,148 @@
+import functools
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import rollbar
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Place
+from .utils import normalize_address, parse_coordinates
+
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.GEOCODER_WORKERS,
+    thread_name_prefix='geocoder',
+)
+
+refreshing_addresses = set()
+refreshing_addresses_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def get_geocoder():
+    geocoder_class = import_string(settings.GEOCODER_BACKEND)
+    return geocoder_class(settings.YANDEX_GEOCODE_APIKEY)
+
+
+def is_found(place):
+    return place.lat is not None and place.lon is not None
+
+
+def is_expired(place, now=None):
+    now = now or timezone.now()
+    if is_found(place):
+        ttl = settings.GEOCODE_CACHE_TTL
+    else:
+        ttl = settings.GEOCODE_NEGATIVE_CACHE_TTL
+    return place.update_date + timedelta(seconds=ttl) <= now
+
+
+def find_place(address):
+    normalized_address = normalize_address(address)
+    places = Place.objects.filter(address__in={address, normalized_address})
+    return min(places, key=lambda place: place.address != normalized_address, default=None)
+
+
+def geocode_place(address, place=None):
+    """Запрашивает геокодер и сохраняет результат, в том числе неудачный.
+
+    Если при обновлении координаты не изменились или геокодер уже найденный
+    адрес не нашёл, старые координаты остаются, сдвигается только дата обновления.
+    """
+    found_coordinates = get_geocoder().fetch_coordinates(address)
+    lat, lon = (found_coordinates and parse_coordinates(*found_coordinates)) or (None, None)
+    if place:
+        if (lat, lon) == (place.lat, place.lon) or (lat is None and is_found(place)):
+            place.update_date = timezone.now()
+            place.save(update_fields=['update_date'])
+            return place
+        place.lat, place.lon, place.update_date = lat, lon, timezone.now()
+        place.save(update_fields=['lat', 'lon', 'update_date'])
+        return place
+
+    place, _ = Place.objects.update_or_create(
+        address=normalize_address(address),
+        defaults={'lat': lat, 'lon': lon, 'update_date': timezone.now()},
+    )
+    return place
+
+
+def resolve_place(address):
+    place = find_place(address)
+    if not place:
+        return geocode_place(address)
+    if not is_expired(place):
+        return place
+    if not is_found(place):
+        return geocode_place(address, place)
+
+    schedule_refresh(place)
+    return place
+
+
+def get_coordinates(address):
+    place = resolve_place(address)
+    return parse_coordinates(place.lat, place.lon)
+
+
+def refresh_in_background(place_id, address):
+    close_old_connections()
+    try:
+        place = Place.objects.filter(pk=place_id).first()
+        if place:
+            geocode_place(address, place)
+    except Exception:
+        rollbar.report_exc_info(sys.exc_info())
+    finally:
+        with refreshing_addresses_lock:
+            refreshing_addresses.discard(address)
+        close_old_connections()
+
+
+def schedule_refresh(place):
+    with refreshing_addresses_lock:
+        if place.address in refreshing_addresses:
+            return
+        refreshing_addresses.add(place.address)
+    executor.submit(refresh_in_background, place.id, place.address)
+
+
+def resolve_place_in_background(address, on_resolved=None, attempt=0):
+    close_old_connections()
+    try:
+        place = resolve_place(address)
+        if on_resolved:
+            on_resolved(place)
+    except Exception:
+        rollbar.report_exc_info(sys.exc_info())
+        schedule_retry(address, on_resolved, attempt + 1)
+    finally:
+        close_old_connections()
+
+
+def schedule_retry(address, on_resolved, attempt):
+    """Повторяет геокодирование с удваивающейся паузой, не больше GEOCODE_RETRY_ATTEMPTS раз.
+
+    Первая пауза дольше, чем размыкается цепь геокодера, поэтому повтор
+    не упирается в ту же ошибку. Адреса, для которых повторы кончились,
+    привязывает команда geocode_places.
+    """
+    if attempt > settings.GEOCODE_RETRY_ATTEMPTS:
+        return
+    delay = settings.GEOCODE_RETRY_DELAY * 2 ** (attempt - 1)
+    timer = threading.Timer(
+        delay,
+        executor.submit,
+        args=[resolve_place_in_background, address, on_resolved, attempt],
+    )
+    timer.daemon = True
+    timer.start()
+
+
+def enqueue_geocoding(address, on_resolved=None):
+    transaction.on_commit(lambda: executor.submit(resolve_place_in_background, address, on_resolved))
@@ -0,0 +1,87 @@
+# Generated by Django 3.2 on 2026-10-18 20:41
+
+import sys
+
+from django.db import migrations, models
+
+
+def parse_coordinate(value, limit):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if -limit <= value <= limit else None
+
+
+def convert_coordinates(apps, schema_editor):
+    Place = apps.get_model('place', 'Place')
+    unparsable_places = []
+    for place in Place.objects.all().iterator():
+        place.lat_number = parse_coordinate(place.lat, 90)
+        place.lon_number = parse_coordinate(place.lon, 180)
+        if place.lat_number is None or place.lon_number is None:
+            place.lat_number = place.lon_number = None
+            if place.lat or place.lon:
+                unparsable_places.append(place.address)
+        place.save(update_fields=['lat_number', 'lon_number'])
+
+    if unparsable_places:
+        # Координаты не распознаны: место станет «не найденным» и будет геокодировано заново
+        Place.objects.filter(address__in=unparsable_places).update(update_date='1970-01-01T00:00:00Z')
+        sys.stdout.write(f'\n  Не удалось распознать координаты мест: {unparsable_places}\n')
+
+
+def restore_coordinates(apps, schema_editor):
+    Place = apps.get_model('place', 'Place')
+    for place in Place.objects.all().iterator():
+        place.lat = '' if place.lat_number is None else str(place.lat_number)
+        place.lon = '' if place.lon_number is None else str(place.lon_number)
+        place.save(update_fields=['lat', 'lon'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('place', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='address',
+            field=models.CharField(max_length=100, unique=True, verbose_name='адрес'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='lat_number',
+            field=models.FloatField(blank=True, null=True, verbose_name='широта'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='lon_number',
+            field=models.FloatField(blank=True, null=True, verbose_name='долгота'),
+        ),
+        migrations.RunPython(convert_coordinates, restore_coordinates),
+        migrations.RemoveField(
+            model_name='place',
+            name='lat',
+        ),
+        migrations.RemoveField(
+            model_name='place',
+            name='lon',
+        ),
+        migrations.RenameField(
+            model_name='place',
+            old_name='lat_number',
+            new_name='lat',
+        ),
+        migrations.RenameField(
+            model_name='place',
+            old_name='lon_number',
+            new_name='lon',
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['lat', 'lon'], name='place_place_lat_322856_idx'),
+        ),
+    ]
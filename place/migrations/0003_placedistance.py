@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 20:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('place', '0002_numeric_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceDistance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.FloatField(verbose_name='расстояние, км')),
+                ('order_place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distances_to', to='place.place', verbose_name='место доставки')),
+                ('restaurant_place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distances_from', to='place.place', verbose_name='место ресторана')),
+            ],
+            options={
+                'verbose_name': 'Расстояние',
+                'verbose_name_plural': 'Расстояния',
+                'unique_together': {('restaurant_place', 'order_place')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 21:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('place', '0003_placedistance'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='place',
+            name='place_place_lat_322856_idx',
+        ),
+    ]
@@ -8,14 +8,14 @@ class Place(models.Model):
         max_length=100,
         unique=True,
     )
-    lat = models.CharField(
+    lat = models.FloatField(
         'широта',
-        max_length=100,
+        null=True,
         blank=True,
     )
-    lon = models.CharField(
+    lon = models.FloatField(
         'долгота',
-        max_length=100,
+        null=True,
         blank=True,
     )
     update_date = models.DateTimeField(
@@ -30,3 +30,29 @@ class Place(models.Model):
 
     def __str__(self):
         return self.address
+
+
+class PlaceDistance(models.Model):
+    restaurant_place = models.ForeignKey(
+        Place,
+        verbose_name='место ресторана',
+        related_name='distances_from',
+        on_delete=models.CASCADE,
+    )
+    order_place = models.ForeignKey(
+        Place,
+        verbose_name='место доставки',
+        related_name='distances_to',
+        on_delete=models.CASCADE,
+    )
+    distance = models.FloatField('расстояние, км')
+
+    class Meta:
+        verbose_name = 'Расстояние'
+        verbose_name_plural = 'Расстояния'
+        unique_together = [
+            ['restaurant_place', 'order_place']
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant_place} - {self.order_place}'
@@ -0,0 +1,34 @@
+import math
+import re
+
+
+KM_PER_DEGREE = 111.32
+
+
+def normalize_address(address):
+    address = address.replace('ё', 'е').replace('Ё', 'Е')
+    address = re.sub(r'\s*,\s*', ', ', address)
+    address = re.sub(r'\s+', ' ', address)
+    return address.strip(' ,.').casefold()
+
+
+def parse_coordinates(lat, lon):
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def get_bounding_box(lat, lon, radius_km):
+    """Границы (min_lat, max_lat, min_lon, max_lon), внутри которых лежит круг радиуса radius_km."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return (
+        max(lat - lat_delta, -90),
+        min(lat + lat_delta, 90),
+        max(lon - min(lon_delta, 180), -180),
+        min(lon + min(lon_delta, 180), 180),
+    )
@@ -1,3 +1,151 @@
-from django.test import TestCase
+import re
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+from django.utils.timezone import make_aware
+
+from foodcartapp.models import OrderDetails
+
+from .views import OrderFilterForm, decode_cursor, encode_cursor, filter_orders
+
+
+class CursorTests(SimpleTestCase):
+    def test_decode_returns_encoded_moment_and_id(self):
+        moment = make_aware(datetime(2026, 10, 18, 12, 30, 15, 123456))
+
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+    def test_decode_rejects_malformed_cursors(self):
+        malformed = [
+            '',
+            '!!!',
+            urlsafe_base64_encode(b'2026-10-18T12:30:15'),
+            urlsafe_base64_encode(b'yesterday|42'),
+            urlsafe_base64_encode(b'2026-10-18T12:30:15|abc'),
+            urlsafe_base64_encode(b'\xff\xfe|1'),
+        ]
+        for cursor in malformed:
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_form_reports_malformed_cursor(self):
+        form = OrderFilterForm({'cursor': '!!!'})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('cursor', form.errors)
+
+
+class FilterOrdersTests(TestCase):
+    def setUp(self):
+        self.early = make_aware(datetime(2026, 10, 18, 10, 0))
+        self.late = make_aware(datetime(2026, 10, 18, 11, 0))
+        self.orders = [
+            OrderDetails.objects.create(
+                firstname='Иван',
+                lastname='Петров',
+                phonenumber='+79291000000',
+                address='Москва, Тверская 1',
+                created_at=created_at,
+            )
+            for created_at in [self.early, self.early, self.early, self.late]
+        ]
+
+    def filter_ids(self, cursor):
+        filters = {'status': None, 'restaurant': None, 'date_from': None, 'date_to': None, 'cursor': cursor}
+        return list(filter_orders(OrderDetails.objects.all(), filters).values_list('id', flat=True))
+
+    def test_without_cursor_orders_by_creation_then_id(self):
+        self.assertEqual(self.filter_ids(None), [order.id for order in self.orders])
+
+    def test_cursor_continues_after_order_with_same_creation_time(self):
+        cursor = decode_cursor(encode_cursor(self.early, self.orders[0].id))
+
+        self.assertEqual(self.filter_ids(cursor), [order.id for order in self.orders[1:]])
+
+    def test_cursor_on_last_order_of_a_moment_moves_to_next_moment(self):
+        cursor = decode_cursor(encode_cursor(self.early, self.orders[2].id))
+
+        self.assertEqual(self.filter_ids(cursor), [self.orders[3].id])
+
+    def test_cursor_after_last_order_returns_nothing(self):
+        cursor = decode_cursor(encode_cursor(self.late, self.orders[3].id))
+
+        self.assertEqual(self.filter_ids(cursor), [])
+
+
+class ViewOrdersTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        for status in [OrderDetails.Status.UNPROCESSED, OrderDetails.Status.PROCESSED] * 3:
+            OrderDetails.objects.create(
+                firstname='Иван',
+                lastname='Петров',
+                phonenumber='+79291000000',
+                address='Москва, Тверская 1',
+                status=status,
+            )
+
+    def collect_pages(self, url):
+        order_ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            order_ids += [item['id'] for item in response.context['order_items']]
+            next_page_url = response.context['next_page_url']
+            url = next_page_url and reverse('restaurateur:view_orders') + next_page_url
+        return order_ids
+
+    @mock.patch('restaurateur.views.ORDERS_PER_PAGE', 1)
+    def test_default_board_keeps_unprocessed_filter_on_next_pages(self):
+        order_ids = self.collect_pages(reverse('restaurateur:view_orders'))
+
+        unprocessed_ids = OrderDetails.objects.filter(status=OrderDetails.Status.UNPROCESSED).order_by('id')
+        self.assertEqual(order_ids, list(unprocessed_ids.values_list('id', flat=True)))
+
+    def test_all_statuses_when_filter_is_cleared(self):
+        order_ids = self.collect_pages(reverse('restaurateur:view_orders') + '?status=&limit=2')
+
+        self.assertEqual(order_ids, list(OrderDetails.objects.order_by('id').values_list('id', flat=True)))
+
+
+class OrderFeedTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        self.order = OrderDetails.objects.create(
+            firstname='Иван',
+            lastname='Петров',
+            phonenumber='+79291000000',
+            address='Москва, Тверская 1',
+        )
+        OrderDetails.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+
+    def get_updates(self, last_event_id):
+        response = self.client.get(reverse('restaurateur:order_updates'), HTTP_LAST_EVENT_ID=last_event_id)
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        return content.count('event: order'), re.findall(r'^id: (\S+)$', content, re.MULTILINE)[-1]
+
+    def test_first_poll_sends_changed_order(self):
+        events, _ = self.get_updates(encode_cursor(timezone.now() - timedelta(minutes=2), 0))
+
+        self.assertEqual(events, 1)
+
+    def test_idle_reconnect_sends_nothing(self):
+        _, last_event_id = self.get_updates(encode_cursor(timezone.now() - timedelta(minutes=2), 0))
+
+        events, _ = self.get_updates(last_event_id)
+
+        self.assertEqual(events, 0)
+
+    def test_reconnect_sends_order_changed_after_last_poll(self):
+        _, last_event_id = self.get_updates(encode_cursor(timezone.now() - timedelta(minutes=2), 0))
+        OrderDetails.objects.update(updated_at=timezone.now())
+
+        events, _ = self.get_updates(last_event_id)
+
+        self.assertEqual(events, 1)
@@ -9,11 +9,17 @@ urlpatterns = [
     path('', lambda request: redirect('restaurateur:ProductsView')),
 
     path('products/', views.view_products, name="ProductsView"),
+    path('products/<int:product_id>/availability/', views.toggle_product_availability,
+         name="toggle_product_availability"),
 
     path('restaurants/', views.view_restaurants, name="RestaurantView"),
 
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders/updates/', views.stream_order_updates, name="order_updates"),
+    path('orders/dispatch/', views.dispatch_open_orders, name="dispatch_orders"),
+
+    path('stats/distances/', views.distance_cache_stats, name="distance_cache_stats"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
@@ -1,23 +1,49 @@
-import functools
+import json
 import sys
+from datetime import datetime, time, timedelta
 
-from geopy import distance
-
+import numpy as np
 from django import forms
-from django.shortcuts import redirect, render
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import F, Prefetch, Q
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme, urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.timezone import make_aware
+from django.views.decorators.http import require_POST
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
-from foodcartapp.models import Product, Restaurant, OrderDetails
-from place.models import Place
+from foodcartapp.dispatch import dispatch_orders
+from foodcartapp.distances import get_distance_cache_stats
+from foodcartapp.models import (
+    OrderCandidateRestaurant,
+    OrderDetails,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from foodcartapp.services import set_product_availability
 
 import rollbar
 
 
+PRODUCTS_PER_PAGE = 50
+ORDERS_PER_PAGE = 50
+MAX_ORDERS_PER_PAGE = 200
+
+ORDERS_FEED_OVERLAP = timedelta(seconds=5)
+ORDERS_FEED_RETRY_MS = 3000
+
+
 class Login(forms.Form):
     username = forms.CharField(
         label='Логин', max_length=75, required=True,
@@ -35,6 +61,43 @@ class Login(forms.Form):
     )
 
 
+class OrderFilterForm(forms.Form):
+    status = forms.TypedChoiceField(
+        label='Статус', required=False,
+        choices=[('', 'Все')] + OrderDetails.Status.choices,
+        coerce=int, empty_value=None,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан', required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    date_from = forms.DateField(
+        label='С', required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    date_to = forms.DateField(
+        label='По', required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    limit = forms.IntegerField(
+        label='На странице', required=False,
+        min_value=1, max_value=MAX_ORDERS_PER_PAGE,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            raise forms.ValidationError('Неверный курсор')
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         try:
@@ -76,33 +139,66 @@ def is_manager(user):
     return user.is_staff  # FIXME replace with specific permission
 
 
+def get_availability_matrix(products, restaurants):
+    product_rows = {product.id: row for row, product in enumerate(products)}
+    restaurant_columns = {restaurant.id: column for column, restaurant in enumerate(restaurants)}
+    availability = np.zeros((len(product_rows), len(restaurant_columns)), dtype=bool)
+
+    menu_items = (
+        RestaurantMenuItem.objects
+            .filter(product__in=product_rows, availability=True)
+            .values_list('product_id', 'restaurant_id')
+    )
+    for product_id, restaurant_id in menu_items:
+        column = restaurant_columns.get(restaurant_id)
+        if column is not None:
+            availability[product_rows[product_id], column] = True
+    return availability
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     try:
         restaurants = list(Restaurant.objects.order_by('name'))
-        products = list(Product.objects.prefetch_related('menu_items'))
+        categories = ProductCategory.objects.order_by('name')
 
-        default_availability = {restaurant.id: False for restaurant in restaurants}
-        products_with_restaurants = []
-        for product in products:
-            availability = {
-                **default_availability,
-                **{item.restaurant_id: item.availability for item in product.menu_items.all()},
-            }
-            orderer_availability = [availability[restaurant.id] for restaurant in restaurants]
+        products = Product.objects.select_related('category').order_by('name', 'id')
+        category_id = request.GET.get('category')
+        if category_id and category_id.isdigit():
+            products = products.filter(category_id=category_id)
+        page = Paginator(products, PRODUCTS_PER_PAGE).get_page(request.GET.get('page'))
 
-            products_with_restaurants.append(
-                (product, orderer_availability)
-            )
+        availability = get_availability_matrix(page.object_list, restaurants)
+        products_with_restaurants = list(zip(page.object_list, availability.tolist()))
 
         return render(request, template_name="products_list.html", context={
             'products_with_restaurants': products_with_restaurants,
             'restaurants': restaurants,
+            'categories': categories,
+            'category_id': category_id,
+            'page': page,
         })
     except:
         rollbar.report_exc_info(sys.exc_info())
 
 
+@require_POST
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def toggle_product_availability(request, product_id):
+    try:
+        product = get_object_or_404(Product, pk=product_id)
+        set_product_availability(product, request.POST.get('availability') == '1')
+
+        next_url = request.POST.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, settings.ALLOWED_HOSTS):
+            return redirect(next_url)
+        return redirect('restaurateur:ProductsView')
+    except Http404:
+        raise
+    except:
+        rollbar.report_exc_info(sys.exc_info())
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
     try:
@@ -113,42 +209,37 @@ def view_restaurants(request):
         rollbar.report_exc_info(sys.exc_info())
 
 
-def get_order_distance(restaurant_address, order_address, places):
-    try:
-        restaurant_attrs = list(filter(lambda restaurant: (restaurant['address'] == restaurant_address), places))[0]
-        order_attrs = list(filter(lambda order: (order['address'] == order_address), places))[0]
-        restaurant_coords = restaurant_attrs['lat'], restaurant_attrs['lon']
-        order_coords = order_attrs['lat'], order_attrs['lon']
-        order_distance = f'{distance.distance(restaurant_coords, order_coords).km:.3f}'
-    except TypeError:
-        rollbar.report_exc_info(sys.exc_info())
-        order_distance = 'Неверный адрес доставки'
-    return order_distance
-
-
-def serialize_order(order, places):
-    restaurants_in_order = []
-    restaurants_in_product = set()
-    products_in_order = order.order_items.all()
-    for product in products_in_order:
-        restaurants = filter(lambda restaurant: restaurant.availability, product.product.menu_items.all())
-        for restaurant in restaurants:
-            order_distance = get_order_distance(restaurant.restaurant.address, order.address, places)
-            restaurants_in_product.add(((restaurant.restaurant.name.split()[-1]), order_distance))
-        restaurants_in_order.append(restaurants_in_product.copy())
-        restaurants_in_product = set()
-    unique_restaurants = restaurants_in_order[0]
-    if unique_restaurants:
-        unique_restaurants = functools.reduce(lambda x, y: x.intersection(y), restaurants_in_order)
-        restaurants_in_order = unique_restaurants
-    else:
-        restaurants_in_order = 'Нет подходящего ресторана'
+def format_order_restaurants(matches):
+    if not matches:
+        return 'Нет подходящего ресторана'
+    return [
+        (
+            match.restaurant.name.split()[-1],
+            f'{match.distance:.3f}' if match.distance is not None else 'Неверный адрес доставки',
+        )
+        for match in matches
+    ]
+
+
+def get_candidates_prefetch():
+    return Prefetch(
+        'candidate_restaurants',
+        queryset=(
+            OrderCandidateRestaurant.objects
+                .select_related('restaurant')
+                .order_by(F('distance').asc(nulls_last=True), 'restaurant__name')
+        ),
+    )
+
+
+def serialize_order(order):
     return {
         'id': order.id,
-        'status': order.status,
-        'restaurants': restaurants_in_order,
-        'payment_method': order.payment_method,
-        'cost': order.cost,
+        'status': order.get_status_display(),
+        'restaurants': format_order_restaurants(order.candidate_restaurants.all()),
+        'restaurant': order.restaurant and order.restaurant.name,
+        'payment_method': order.get_payment_method_display() or '',
+        'cost': order.total_cost,
         'fullname': f'{order.firstname} {order.lastname}',
         'phonenumber': order.phonenumber,
         'comments': order.comments,
@@ -156,17 +247,157 @@ def serialize_order(order, places):
     }
 
 
+def encode_cursor(moment, object_id):
+    cursor = f'{moment.isoformat()}|{object_id}'
+    return urlsafe_base64_encode(cursor.encode())
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, order_id = urlsafe_base64_decode(cursor).decode().split('|')
+        created_at = datetime.fromisoformat(created_at)
+        return created_at, int(order_id)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+
+def filter_orders(orders, filters):
+    if filters['status']:
+        orders = orders.filter(status=filters['status'])
+    if filters['restaurant']:
+        orders = orders.filter(restaurant=filters['restaurant'])
+    if filters['date_from']:
+        orders = orders.filter(created_at__gte=make_aware(datetime.combine(filters['date_from'], time.min)))
+    if filters['date_to']:
+        date_to = filters['date_to'] + timedelta(days=1)
+        orders = orders.filter(created_at__lt=make_aware(datetime.combine(date_to, time.min)))
+    if filters['cursor']:
+        created_at, order_id = filters['cursor']
+        orders = orders.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=order_id)
+        )
+    return orders.order_by('created_at', 'id')
+
+
+@require_POST
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def dispatch_open_orders(request):
+    try:
+        dispatch_orders()
+
+        next_url = request.POST.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, settings.ALLOWED_HOSTS):
+            return redirect(next_url)
+        return redirect('restaurateur:view_orders')
+    except:
+        rollbar.report_exc_info(sys.exc_info())
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
     try:
-        order_items = OrderDetails.objects.get_order_with_cost(). \
-            filter(status='Необработанный'). \
-            prefetch_related('order_items__product', 'order_items__product__menu_items__restaurant')
-        places = Place.objects.values('address', 'lat', 'lon')
+        filter_data = request.GET.copy()
+        filter_data.setdefault('status', OrderDetails.Status.UNPROCESSED)
+        filter_form = OrderFilterForm(filter_data)
+        if not filter_form.is_valid():
+            return render(request, template_name='order_items.html', context={
+                'filter_form': filter_form,
+                'order_items': [],
+            }, status=400)
+        filters = filter_form.cleaned_data
+        limit = filters['limit'] or ORDERS_PER_PAGE
+        rendered_at = timezone.now()
+
+        orders = list(
+            filter_orders(OrderDetails.objects.select_related('restaurant'), filters)
+                .prefetch_related(get_candidates_prefetch())[:limit + 1]
+        )
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
+        next_page_url = None
+        if next_cursor:
+            query = filter_form.data.copy()
+            query['cursor'] = next_cursor
+            next_page_url = f'?{query.urlencode()}'
+
+        feed_query = QueryDict(mutable=True)
+        feed_query.update(filter_form.data)
+        feed_query.pop('cursor', None)
+        feed_query['since'] = encode_cursor(rendered_at, 0)
+
         context = {
-            'order_items': [serialize_order(order, places) for order in order_items],
+            'filter_form': filter_form,
+            'order_items': [serialize_order(order) for order in orders],
+            'next_page_url': next_page_url,
+            'feed_query': feed_query.urlencode(),
+            'board_url': request.get_full_path(),
         }
 
         return render(request, template_name='order_items.html', context=context)
     except:
         rollbar.report_exc_info(sys.exc_info())
+
+
+def render_order_updates(filters, since, board_url):
+    """События SSE о заказах, изменённых после since, за один запрос к базе.
+
+    Ответ сразу закрывается, а EventSource переподключается через
+    ORDERS_FEED_RETRY_MS с последним id. Последний id — время начала запроса,
+    поэтому следующий запрос пересылает только заказы из окна ORDERS_FEED_OVERLAP
+    перед ним: изменения транзакций, которые ещё не успели закоммититься.
+    Доска просто заменит такие строки тем же содержимым.
+    """
+    started_at = timezone.now()
+    changed_orders = list(
+        OrderDetails.objects
+            .filter(updated_at__gt=since - ORDERS_FEED_OVERLAP)
+            .order_by('updated_at', 'id')
+            .select_related('restaurant')
+            .prefetch_related(get_candidates_prefetch())
+    )
+    visible_ids = set(
+        filter_orders(OrderDetails.objects.filter(pk__in=[order.id for order in changed_orders]), filters)
+            .values_list('id', flat=True)
+    ) if changed_orders else set()
+    rows = {
+        item['id']: render_to_string('order_row.html', {'item': item, 'board_url': board_url})
+        for item in [serialize_order(order) for order in changed_orders if order.id in visible_ids]
+    }
+
+    events = [f'retry: {ORDERS_FEED_RETRY_MS}\n\n']
+    for order in changed_orders:
+        event = json.dumps({'id': order.id, 'visible': order.id in rows, 'html': rows.get(order.id)})
+        events.append(f'event: order\ndata: {event}\n\n')
+    events.append(f'id: {encode_cursor(started_at, 0)}\n\n')
+    return ''.join(events)
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def stream_order_updates(request):
+    filter_form = OrderFilterForm(request.GET)
+    if not filter_form.is_valid():
+        return HttpResponseBadRequest()
+    filters = {**filter_form.cleaned_data, 'cursor': None}
+
+    try:
+        since, _ = decode_cursor(request.headers.get('Last-Event-ID') or request.GET.get('since', ''))
+    except ValueError:
+        since = timezone.now()
+
+    board_query = request.GET.copy()
+    board_query.pop('since', None)
+    board_url = f"{reverse('restaurateur:view_orders')}?{board_query.urlencode()}"
+    response = HttpResponse(
+        render_order_updates(filters, since, board_url),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def distance_cache_stats(request):
+    return JsonResponse(get_distance_cache_stats())
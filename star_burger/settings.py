@@ -94,9 +94,13 @@ WSGI_APPLICATION = 'star_burger.wsgi.application'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+RESIZE_CACHE_DIR = env.str('RESIZE_CACHE_DIR', os.path.join(BASE_DIR, 'media_cache'))
+RESIZE_CACHE_MAX_BYTES = env.int('RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
 
 DATABASES = {"default": env.dj_db_url("DATABASE_URL")}
 
+CACHES = {"default": env.dj_cache_url("CACHE_URL", "locmem://")}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,6 +117,13 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 YANDEX_GEOCODE_APIKEY = env.str('YANDEX_GEOCODE_APIKEY')
+GEOCODER_BACKEND = env.str('GEOCODER_BACKEND', 'foodcartapp.utils.YandexGeocoder')
+GEOCODER_WORKERS = env.int('GEOCODER_WORKERS', 2)
+GEOCODE_CACHE_TTL = env.int('GEOCODE_CACHE_TTL', 30 * 24 * 60 * 60)
+GEOCODE_NEGATIVE_CACHE_TTL = env.int('GEOCODE_NEGATIVE_CACHE_TTL', 24 * 60 * 60)
+GEOCODE_RETRY_DELAY = env.int('GEOCODE_RETRY_DELAY', 60)
+GEOCODE_RETRY_ATTEMPTS = env.int('GEOCODE_RETRY_ATTEMPTS', 5)
+DISTANCE_CACHE_SIZE = env.int('DISTANCE_CACHE_SIZE', 100000)
 
 LANGUAGE_CODE = 'ru-RU'
 
@@ -19,9 +19,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import render
 
+from foodcartapp.views import resize_media_image
 from . import settings
 
 urlpatterns = [
+    path(f'{settings.MEDIA_URL.lstrip("/")}resize/<int:width>x<int:height>/<path:path>', resize_media_image,
+         name='resize_media_image'),
     path('admin/', admin.site.urls),
     path('', render, kwargs={'template_name': 'index.html'}, name='start_page'),
     path('api/', include('foodcartapp.urls')),